@@ -0,0 +1,118 @@
+"""
+Document-building benchmark: payload -> BSON-ready upsert documents.
+
+    python benchmarks/bench_docs.py [--sizes 1000 10000 100000] [--iterations 5]
+    python benchmarks/bench_docs.py --compare OLD.json NEW.json
+
+Compares the "records" path ingestion uses (one TypeAdapter validation of the
+payload, slotted NewsRecords, NewsRecord.to_document) against the former
+"beanie" path (a validated News Document per article dumped with get_dict).
+Reports per-article CPU time and traced allocations; no Mongo writes happen.
+Beanie needs an initialized model to construct News, so mongomock-motor is used
+as an in-memory stand-in.
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+from datetime import datetime
+
+from common import compare_results, count_articles, latency_stats, load_payloads, write_results
+
+
+def beanie_documents(payload: dict) -> list:
+    from beanie.odm.utils.dump import get_dict
+    from models.news import News
+
+    documents = []
+    keep_nulls = News.get_settings().keep_nulls
+    for block in payload.get("response", []):
+        for fetched in block.get("agent_response", {}).get("news_fetched", []):
+            news_datetime = datetime.utcfromtimestamp(fetched.get("datetime"))
+            for item in fetched.get("news", []):
+                news = News(
+                    preference_name=fetched.get("name"),
+                    heading=item.get("heading"),
+                    description=item.get("news"),
+                    news_datetime=news_datetime,
+                    image=item.get("image", ""),
+                    src=item.get("src", []),
+                )
+                document = get_dict(news, to_db=True, keep_nulls=keep_nulls)
+                document.pop("_id", None)
+                documents.append(document)
+    return documents
+
+
+def record_documents(payload: dict) -> list:
+    from services.news_service import iter_news_from_api_response
+
+    inserted_at = datetime.utcnow()
+    return [record.to_document(inserted_at) for record in iter_news_from_api_response(payload)]
+
+
+def measure(build, payload: dict, iterations: int) -> tuple[list, int]:
+    """(latencies, peak traced bytes of one run)."""
+    build(payload)  # warm-up
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        build(payload)
+        latencies.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    build(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return latencies, peak
+
+
+async def init_models():
+    from beanie import init_beanie
+    from models.news import News
+
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise SystemExit("Install mongomock-motor to construct Beanie documents without a mongod")
+    await init_beanie(database=AsyncMongoMockClient()["bench-docs"], document_models=[News], skip_indexes=True)
+
+
+def main(args):
+    asyncio.run(init_models())
+    results = {}
+
+    for label, body in load_payloads(args.sizes).items():
+        payload = json.loads(body)
+        articles = count_articles(payload)
+        for path, build in (("beanie", beanie_documents), ("records", record_documents)):
+            latencies, peak = measure(build, payload, args.iterations)
+            stats = latency_stats(latencies)
+            stats.update({
+                "articles": articles,
+                "us_per_article": stats["p50"] / articles * 1e6 if articles else 0.0,
+                "alloc_bytes_per_article": peak / articles if articles else 0.0,
+            })
+            results[f"{path}/{label}"] = stats
+            print(
+                f"{path:<8} {label:<18} {stats['us_per_article']:>8.1f} us/article  "
+                f"{stats['alloc_bytes_per_article']:>8.0f} B/article  p50={stats['p50'] * 1000:.1f}ms"
+            )
+
+    path = write_results("docs", results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--output", help="result file path (default: benchmarks/results/)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="print deltas between two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare, keys=("us_per_article", "alloc_bytes_per_article", "p50", "p95"))
+    else:
+        main(args)
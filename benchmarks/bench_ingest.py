@@ -0,0 +1,167 @@
+"""
+Ingestion throughput benchmark.
+
+    python benchmarks/bench_ingest.py                        # in-memory Mongo stand-in (mongomock-motor)
+    python benchmarks/bench_ingest.py --mongo-uri mongodb://localhost:27017
+    python benchmarks/bench_ingest.py --compare OLD.json NEW.json
+
+Each payload (data.json plus synthetic 1k/10k/100k-article responses) runs two
+scenarios: "ingest" times insert_news_from_api_response on the parsed payload,
+and "e2e" times run_agent_call against a local mock agent server (HTTP, parse,
+upsert and the AgentCallLog write). The collections are emptied before every
+iteration so each one measures fresh inserts, not dedup matches. Every
+scenario runs in a fresh interpreter, so its peak_rss_mb is its own peak
+rather than the high-water mark of everything run before it.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+from common import (
+    MockAgentServer, compare_results, count_articles, latency_stats, load_payloads, peak_rss_mb, write_results,
+)
+
+BENCH_DB = "bench-sane-news"
+
+
+async def init_database(mongo_uri: str | None, models: list):
+    from beanie import init_beanie
+    from services.indexes import ensure_indexes
+
+    if mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(mongo_uri)
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("Install mongomock-motor or pass --mongo-uri to benchmark against a real mongod")
+        client = AsyncMongoMockClient()
+
+    # Every model run_agent_call may touch (run locks, circuit breaker, cache, ...), indexed as cron.init_db does
+    await init_beanie(database=client[BENCH_DB], document_models=models, skip_indexes=True)
+    await ensure_indexes(models, required_only=not mongo_uri)
+    return client
+
+
+async def reset_collections():
+    from models.agent_call_log import AgentCallLog
+    from models.news import News
+    await News.delete_all()
+    await AgentCallLog.delete_all()
+
+
+async def bench_ingest(payload: dict, iterations: int, writers: int, queue_depth: int) -> list[float]:
+    from services.news_service import insert_news_from_api_response
+
+    latencies = []
+    for _ in range(iterations):
+        await reset_collections()
+        started = time.perf_counter()
+        await insert_news_from_api_response(payload, writers=writers, queue_depth=queue_depth)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def bench_e2e(iterations: int) -> list[float]:
+    import cron
+
+    latencies = []
+    async with cron.make_http_client() as client_http:
+        for i in range(iterations):
+            await reset_collections()
+            started = time.perf_counter()
+            status = await cron.run_agent_call(client_http, session_id=f"bench-{i}")
+            latencies.append(time.perf_counter() - started)
+            if status != "pass":
+                raise RuntimeError(f"run_agent_call returned {status!r}")
+    return latencies
+
+
+def summarize(latencies: list[float], articles: int) -> dict:
+    total = sum(latencies)
+    return {
+        "articles": articles,
+        "iterations": len(latencies),
+        "articles_per_sec": articles * len(latencies) / total if total else 0.0,
+        **latency_stats(latencies),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def run_scenario(args) -> dict:
+    """Run one (scenario, payload) pair of the parent's plan in this process."""
+    scenario, label = args.scenario
+    sizes = [int(label.rsplit("-", 1)[1])] if label.startswith("synthetic-") else []
+    body = load_payloads(sizes)[label]
+    payload = json.loads(body)
+
+    async with MockAgentServer(body) as server:
+        # cron.py reads its config at import time
+        os.environ["NEWS_API_URL"] = server.url
+        os.environ["MONGO_URI"] = args.mongo_uri or "mongodb://localhost:27017"
+        os.environ["INGEST_WRITERS"] = str(args.writers)
+        os.environ["INGEST_QUEUE_DEPTH"] = str(args.queue_depth)
+        import cron
+        logging.getLogger().setLevel(logging.WARNING)
+
+        client = await init_database(args.mongo_uri, cron.document_models())
+        try:
+            if scenario == "ingest":
+                latencies = await bench_ingest(payload, args.iterations, args.writers, args.queue_depth)
+            else:
+                latencies = await bench_e2e(args.iterations)
+        finally:
+            await reset_collections()
+            client.close()
+    return summarize(latencies, count_articles(payload))
+
+
+def main(args):
+    options = ["--iterations", str(args.iterations), "--writers", str(args.writers), "--queue-depth", str(args.queue_depth)]
+    if args.mongo_uri:
+        options += ["--mongo-uri", args.mongo_uri]
+
+    results = {}
+    for label in ["data.json"] + [f"synthetic-{size}" for size in args.sizes]:
+        for scenario in ("ingest", "e2e"):
+            proc = subprocess.run(
+                [sys.executable, __file__, "--scenario", scenario, label, *options],
+                stdout=subprocess.PIPE, text=True, check=True,
+            )
+            # The stats are the child's last line; cron's log handler may write before it
+            stats = json.loads(proc.stdout.strip().splitlines()[-1])
+            results[f"{scenario}/{label}"] = stats
+            print(
+                f"{scenario:<7} {label:<18} {stats['articles_per_sec']:>10.0f} articles/s  "
+                f"p50={stats['p50'] * 1000:.1f}ms p95={stats['p95'] * 1000:.1f}ms "
+                f"p99={stats['p99'] * 1000:.1f}ms rss={stats['peak_rss_mb']:.0f}MB"
+            )
+
+    path = write_results("ingest", results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--writers", type=int, default=2, help="concurrent bulk_write tasks (INGEST_WRITERS)")
+    parser.add_argument("--queue-depth", type=int, default=4, help="chunks buffered for the writers (INGEST_QUEUE_DEPTH)")
+    parser.add_argument("--mongo-uri", help="benchmark against this mongod instead of the in-memory stand-in")
+    parser.add_argument("--output", help="result file path (default: benchmarks/results/)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="print deltas between two result files")
+    parser.add_argument("--scenario", nargs=2, metavar=("SCENARIO", "PAYLOAD"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+    elif args.scenario:
+        print(json.dumps(asyncio.run(run_scenario(args))))
+    else:
+        main(args)
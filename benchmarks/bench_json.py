@@ -0,0 +1,62 @@
+"""
+JSON backend benchmark.
+
+    python benchmarks/bench_json.py [--sizes 1000 10000 100000] [--iterations 20]
+    python benchmarks/bench_json.py --compare OLD.json NEW.json
+
+Times services.json_backend decode (what the buffered ingestion path does with
+the agent response body) and encode (the request body) on data.json and
+synthetic data.json-shaped payloads, for every backend that is installed.
+"""
+import argparse
+import time
+
+from common import compare_results, latency_stats, load_payloads, write_results
+from services import json_backend
+
+
+def time_calls(fn, arg, iterations: int) -> list:
+    fn(arg)  # warm-up
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn(arg)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main(args):
+    payloads = load_payloads(args.sizes)
+    backends = [json_backend.get_backend(name) for name in json_backend.BACKENDS]
+    backends = list({backend.name: backend for backend in backends}.values())  # missing ones resolve to json
+    results = {}
+
+    for label, body in payloads.items():
+        parsed = json_backend.get_backend("json").loads(body)
+        mb = len(body) / (1024 * 1024)
+        for backend in backends:
+            for op, fn, arg in (("decode", backend.loads, body), ("encode", backend.dumps, parsed)):
+                stats = latency_stats(time_calls(fn, arg, args.iterations))
+                stats["mb_per_sec"] = mb / stats["p50"] if stats["p50"] else 0.0
+                results[f"{op}/{backend.name}/{label}"] = stats
+                print(
+                    f"{op:<7} {backend.name:<8} {label:<18} {stats['mb_per_sec']:>8.1f} MB/s  "
+                    f"p50={stats['p50'] * 1000:.2f}ms p95={stats['p95'] * 1000:.2f}ms"
+                )
+
+    path = write_results("json", results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--output", help="result file path (default: benchmarks/results/)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="print deltas between two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare, keys=("mb_per_sec", "p50", "p95", "p99"))
+    else:
+        main(args)
@@ -0,0 +1,118 @@
+"""
+Cold-start benchmark for cron.py.
+
+    python benchmarks/bench_startup.py [--runs 5]
+    python benchmarks/bench_startup.py --compare OLD.json NEW.json
+
+Every measurement uses a fresh interpreter:
+  import       cumulative `-X importtime` cost of `import cron`, plus the heaviest modules
+  help         wall time of `cron.py --help`
+  check-config wall time of `cron.py check-config`
+  first-request time from spawning `cron.py` to its agent request reaching a local
+               mock server (MongoDB points at a closed port; the run is killed
+               as soon as the request arrives)
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from common import ROOT, MockAgentServer, compare_results, latency_stats, write_results
+
+CRON = str(ROOT / "cron.py")
+
+
+def child_env(**overrides) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "MONGO_URI": "mongodb://127.0.0.1:1/?serverSelectionTimeoutMS=500",
+        "NEWS_API_URL": "http://127.0.0.1:1/chat",
+        "RETRIES": "0",
+    })
+    env.pop("METRICS_TEXTFILE", None)
+    env.update(overrides)
+    return env
+
+
+def import_profile() -> tuple[float, list]:
+    """(cumulative ms for `import cron`, [(module, cumulative ms), ...] heaviest first under it)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import cron"],
+        cwd=ROOT, env=child_env(), capture_output=True, text=True, check=True,
+    )
+    entries = []  # (depth, module, cumulative ms) in completion order
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        entries.append((depth, name.strip(), int(cumulative_us) / 1000))
+
+    # Each module is listed after everything it imported, so cron's subtree is the
+    # run of nested entries right before its own top-level line
+    end = max(i for i, (depth, name, _) in enumerate(entries) if depth == 0 and name == "cron")
+    start = end
+    while start > 0 and entries[start - 1][0] > 0:
+        start -= 1
+    subtree = sorted(((name, ms) for _, name, ms in entries[start:end]), key=lambda m: m[1], reverse=True)
+    return entries[end][2], subtree[:15]
+
+
+def wall_time(*args: str) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, CRON, *args], cwd=ROOT, env=child_env(), capture_output=True, check=False)
+    return time.perf_counter() - started
+
+
+async def time_to_first_request() -> float:
+    async with MockAgentServer() as server:
+        started = time.perf_counter()
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, CRON, cwd=ROOT, env=child_env(NEWS_API_URL=server.url),
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.DEVNULL,
+        )
+        try:
+            await asyncio.wait_for(server.request_received.wait(), timeout=60)
+            return server.request_times[0] - started
+        finally:
+            if proc.returncode is None:
+                proc.kill()
+            await proc.wait()
+
+
+def summarize(samples: list[float]) -> dict:
+    return {"runs": len(samples), **latency_stats(samples)}
+
+
+def main(args):
+    results = {}
+
+    imports = [import_profile() for _ in range(args.runs)]
+    results["import"] = {**summarize([total / 1000 for total, _ in imports]), "heaviest_ms": imports[-1][1]}
+    results["help"] = summarize([wall_time("--help") for _ in range(args.runs)])
+    results["check-config"] = summarize([wall_time("check-config") for _ in range(args.runs)])
+    results["first-request"] = summarize([asyncio.run(time_to_first_request()) for _ in range(args.runs)])
+
+    for scenario, stats in results.items():
+        print(f"{scenario:<14} p50={stats['p50'] * 1000:8.1f}ms  p95={stats['p95'] * 1000:8.1f}ms")
+    print("heaviest imports under `import cron`:")
+    for name, ms in results["import"]["heaviest_ms"][:10]:
+        print(f"  {ms:8.1f}ms  {name}")
+
+    path = write_results("startup", results, args.output)
+    print(f"Results written to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--output", help="result file path (default: benchmarks/results/)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="print deltas between two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare, keys=("p50", "p95", "p99"))
+    else:
+        main(args)
@@ -0,0 +1,185 @@
+"""Shared helpers for the benchmark scripts: payloads, mock agent server, stats, result files."""
+import asyncio
+import json
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+DATA_JSON = ROOT / "data.json"
+
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+WORDS = (
+    "market science league transfer climate election research launch season record "
+    "policy startup orbit vaccine quarter merger final championship budget study"
+).split()
+
+
+def make_payload(n_articles: int, preferences=("Science", "Sports", "Technology", "Business"), seed: int = 0) -> dict:
+    """Build a data.json-shaped agent response with `n_articles` unique articles."""
+    rng = random.Random(seed)
+    per_pref = -(-n_articles // len(preferences))
+    response = []
+    produced = 0
+
+    for preference in preferences:
+        count = min(per_pref, n_articles - produced)
+        if count <= 0:
+            break
+        news = [
+            {
+                "heading": f"{preference} {produced + i}: " + " ".join(rng.choices(WORDS, k=8)).title(),
+                "news": " ".join(rng.choices(WORDS, k=60)).capitalize() + ".",
+                "image": "",
+                "src": [f"https://example.com/{preference.lower()}/{produced + i}"],
+            }
+            for i in range(count)
+        ]
+        produced += count
+        response.append({
+            "preference": preference,
+            "agent_response": {
+                "news_fetched": [{
+                    "name": preference,
+                    "description": f"Latest {preference} news.",
+                    "datetime": 1727881200 + produced,
+                    "news": news,
+                }],
+            },
+        })
+    return {"response": response}
+
+
+def load_payloads(sizes) -> dict:
+    """{label: payload bytes} for data.json plus one synthetic payload per size."""
+    payloads = {"data.json": DATA_JSON.read_bytes()}
+    for size in sizes:
+        payloads[f"synthetic-{size}"] = json.dumps(make_payload(size)).encode("utf-8")
+    return payloads
+
+
+def count_articles(payload: dict) -> int:
+    return sum(
+        len(fetched.get("news", []))
+        for block in payload.get("response", [])
+        for fetched in block.get("agent_response", {}).get("news_fetched", [])
+    )
+
+
+class MockAgentServer:
+    """Minimal HTTP/1.1 server that answers every POST with `self.body`."""
+
+    def __init__(self, body: bytes = b"{}"):
+        self.body = body
+        self._server = None
+        self.url = None
+        self.request_times = []  # time.perf_counter() at each request's arrival
+        self.request_received = asyncio.Event()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                self.request_times.append(time.perf_counter())
+                self.request_received.set()
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                    b"Content-Length: " + str(len(self.body)).encode() + b"\r\n\r\n" + self.body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def __aenter__(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/chat"
+        return self
+
+    async def __aexit__(self, *exc):
+        self._server.close()
+        await self._server.wait_closed()
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    low, high = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (k - low)
+
+
+def latency_stats(latencies) -> dict:
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    # High-water mark of this whole process so far, so only per scenario when each runs in its own process.
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(name: str, results: dict, output: str | None = None) -> Path:
+    """Save `results` with run metadata; defaults to benchmarks/results/<name>-<rev>-<time>.json."""
+    revision = git_revision()
+    document = {
+        "benchmark": name,
+        "revision": revision,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if output:
+        path = Path(output)
+    else:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+        path = RESULTS_DIR / f"{name}-{revision}-{stamp}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(document, indent=2), encoding="utf-8")
+    return path
+
+
+def compare_results(old_path: str, new_path: str, keys=("articles_per_sec", "p50", "p95", "p99", "peak_rss_mb")):
+    """Print per-scenario deltas between two result files of the same benchmark."""
+    old = json.loads(Path(old_path).read_text())["results"]
+    new = json.loads(Path(new_path).read_text())["results"]
+    for scenario in sorted(set(old) & set(new)):
+        print(scenario)
+        for key in keys:
+            if key in old[scenario] and key in new[scenario]:
+                before, after = old[scenario][key], new[scenario][key]
+                change = (after - before) / before * 100 if before else 0.0
+                print(f"  {key:<18} {before:>12.4f} -> {after:>12.4f}  ({change:+.1f}%)")
@@ -1,16 +1,30 @@
 #!/usr/bin/env python3
+# Heavy dependencies (httpx, motor, beanie, pydantic, the models and the
+# ingestion services) are imported inside the functions that use them, so
+# --help, check-config and --dry-run start without loading them.
+from __future__ import annotations
+
+import argparse
 import asyncio
+import importlib.util
 import os
+import signal
 import sys
-import httpx
+import time
+import uuid
 import logging
-import json
 from datetime import datetime, timezone
-from motor.motor_asyncio import AsyncIOMotorClient
-from beanie import init_beanie, Document
+from typing import TYPE_CHECKING
 from dotenv import load_dotenv
-from models.news import News
-from services.news_service import insert_news_from_api_response
+from services.users import UserTarget, load_users_collection, load_users_file
+from services.scheduler import Scheduler, build_schedule
+from services.timing import Timer, http_trace
+from services import json_backend, metrics
+
+if TYPE_CHECKING:
+    import httpx
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from services.agent_client import AttemptRecord, RetryPolicy, TransferSizes
 
 # Load .env variables
 load_dotenv()
@@ -31,111 +45,1303 @@ USER_ID = os.getenv("USER_ID", "user_1")
 QUERY = os.getenv("QUERY", "Generate news using preference")
 MODEL_NAME = os.getenv("MODEL_NAME", "gpt-3.5-turbo")
 DB_NAME = os.getenv("DB_NAME", "sane-news")
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))
+INGEST_WRITERS = int(os.getenv("INGEST_WRITERS", "2"))  # concurrent bulk_write tasks
+INGEST_QUEUE_DEPTH = int(os.getenv("INGEST_QUEUE_DEPTH", "4"))  # built chunks waiting for a writer
+# Raw responses kept until ingested; empty disables. By default next to cron.py, not in cron's working directory
+SPOOL_DIR = os.getenv("SPOOL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "spool"))
+BACKFILL_CHECKPOINT = os.getenv("BACKFILL_CHECKPOINT", "backfill-checkpoint.jsonl")
 
-# Fail early if important variables are missing
-missing_vars = []
-if not MONGO_URI:
-    missing_vars.append("MONGO_URI")
-if not NEWS_API_URL:
-    missing_vars.append("NEWS_API_URL")
-if missing_vars:
-    logger.error(f"❌ Missing required environment variables: {', '.join(missing_vars)}")
-    sys.exit(1)
+# One run per (APP_NAME, user) at a time, across processes and hosts. Off by default: the
+# lease is in MongoDB, so a one-shot run waits for the Mongo setup before calling the agent
+RUN_LOCK = os.getenv("RUN_LOCK", "false").lower() in ("1", "true", "yes")
+RUN_LOCK_TTL = float(os.getenv("RUN_LOCK_TTL", "60"))  # lease lifetime without a heartbeat
+RUN_LOCK_WAIT = float(os.getenv("RUN_LOCK_WAIT", "0"))  # 0 = skip at once if another run holds it
 
+# Job queue (enqueue / worker commands)
+JOB_INTERVAL = float(os.getenv("JOB_INTERVAL", "900"))  # seconds between runs of one job
+JOB_LEASE = float(os.getenv("JOB_LEASE", "300"))  # a crashed worker's jobs are retried after this
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+# Unique and TTL indexes are always ensured at startup; this adds the secondary (query) ones
+ENSURE_INDEXES = os.getenv("ENSURE_INDEXES", "false").lower() in ("1", "true", "yes")
+STREAM_PARSE = os.getenv("STREAM_PARSE", "false").lower() in ("1", "true", "yes")
+JSON_BACKEND = os.getenv("JSON_BACKEND", "auto")  # auto, orjson, msgspec or json
+# Fan-out: one agent call per preference instead of one call for all of them
+FANOUT = os.getenv("FANOUT", "false").lower() in ("1", "true", "yes")
+FANOUT_CONCURRENCY = int(os.getenv("FANOUT_CONCURRENCY", "4"))
+# Comma-separated; when empty, fan-out uses the preferences already stored in `news`
+PREFERENCES = [p.strip() for p in os.getenv("PREFERENCES", "").split(",") if p.strip()]
+# Batch mode: many users in one process
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+BATCH_USERS_FILE = os.getenv("BATCH_USERS_FILE")
+BATCH_USERS_COLLECTION = os.getenv("BATCH_USERS_COLLECTION", "users")
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+# Adaptive (AIMD) limit on concurrent agent calls across the whole process
+ADAPTIVE_CONCURRENCY = os.getenv("ADAPTIVE_CONCURRENCY", "false").lower() in ("1", "true", "yes")
+AGENT_CONCURRENCY_MIN = int(os.getenv("AGENT_CONCURRENCY_MIN", "1"))
+AGENT_CONCURRENCY_MAX = int(os.getenv("AGENT_CONCURRENCY_MAX", str(HTTP_MAX_CONNECTIONS)))
+# Starts unthrottled: the limit only drops below the configured concurrency on overload
+AGENT_CONCURRENCY_INITIAL = int(os.getenv("AGENT_CONCURRENCY_INITIAL", str(AGENT_CONCURRENCY_MAX)))
+AGENT_LATENCY_TOLERANCE = float(os.getenv("AGENT_LATENCY_TOLERANCE", "2"))  # x baseline before backing off
+# Daemon mode: interval in seconds or a 5-field cron expression (UTC)
+SCHEDULE_INTERVAL = float(os.getenv("SCHEDULE_INTERVAL", "0")) or None
+SCHEDULE_CRON = os.getenv("SCHEDULE_CRON")
+SHUTDOWN_GRACE = float(os.getenv("SHUTDOWN_GRACE", "300"))
+# Metrics: /metrics HTTP port in daemon mode (0 disables), textfile-collector path otherwise
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_TEXTFILE = os.getenv("METRICS_TEXTFILE")
+# Agent HTTP call: timeouts in seconds (0 disables), retries on 5xx / transport errors
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "10")) or None
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "300")) or None
+TIMEOUT = float(os.getenv("TIMEOUT", "300")) or None  # total per attempt
+RUN_DEADLINE = float(os.getenv("RUN_DEADLINE", "900")) or None  # whole call incl. retries and ingestion
+RETRIES = int(os.getenv("RETRIES", "2"))
+RETRY_BACKOFF = float(os.getenv("RETRY_BACKOFF", "1"))
+RETRY_BACKOFF_MAX = float(os.getenv("RETRY_BACKOFF_MAX", "30"))
+# Agent response cache in MongoDB, keyed by (app, user, query, model, preference), or by the
+# coalesced request alone with COALESCE; TTL 0 disables it
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "0"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "10000")) or None
+RESPONSE_CACHE_MAX_MB = float(os.getenv("RESPONSE_CACHE_MAX_MB", "512")) or None  # gzipped bodies
+# Share one agent call between concurrent calls for the same (preference, model, query), e.g. users
+# of a batch with the same preference; calls without a preference are per user and never shared
+COALESCE = os.getenv("COALESCE", "false").lower() in ("1", "true", "yes")
+COALESCE_LINGER = float(os.getenv("COALESCE_LINGER", "5"))  # seconds a finished response is still shared
+# Circuit breaker on NEWS_API_URL, shared through MongoDB by every process
+CIRCUIT_BREAKER = os.getenv("CIRCUIT_BREAKER", "true").lower() in ("1", "true", "yes")
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))  # consecutive failures that open it
+BREAKER_LATENCY = float(os.getenv("BREAKER_LATENCY", "0")) or None  # slower calls count as failures
+BREAKER_RESET = float(os.getenv("BREAKER_RESET", "60"))  # seconds open before a probe is let through
 
-# Define AgentCallLog model
-class AgentCallLog(Document):
-    session_id: str
-    start_timestamp: datetime
-    end_timestamp: datetime
-    status: str
-    total_time_taken: float
-    response_size: int
-    error_message: str | None = None
+REQUIRED_VARS = ("MONGO_URI", "NEWS_API_URL")
 
-    class Settings:
-        name = "agent_call_log"
 
+def missing_config(required=REQUIRED_VARS) -> list[str]:
+    return [name for name in required if not globals().get(name)]
+
+
+def require_config(required=REQUIRED_VARS):
+    # Fail early if important variables are missing
+    missing_vars = missing_config(required)
+    if missing_vars:
+        logger.error(f"❌ Missing required environment variables: {', '.join(missing_vars)}")
+        sys.exit(1)
+
+
+def __getattr__(name):
+    # AgentCallLog used to live here; keep `from cron import AgentCallLog` working without
+    # importing beanie for every command
+    if name == "AgentCallLog":
+        from models.agent_call_log import AgentCallLog
+        return AgentCallLog
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def retry_policy() -> RetryPolicy:
+    from services.agent_client import RetryPolicy
+
+    return RetryPolicy(
+        retries=RETRIES,
+        backoff_base=RETRY_BACKOFF,
+        backoff_max=RETRY_BACKOFF_MAX,
+        attempt_timeout=TIMEOUT,
+    )
+
+
+_limiter = None
+
+
+def get_limiter():
+    """The process-wide agent concurrency limiter, or None when ADAPTIVE_CONCURRENCY is off."""
+    global _limiter
+    if _limiter is None and ADAPTIVE_CONCURRENCY:
+        from services.limiter import AdaptiveLimiter
+        _limiter = AdaptiveLimiter(
+            initial=AGENT_CONCURRENCY_INITIAL,
+            min_limit=AGENT_CONCURRENCY_MIN,
+            max_limit=AGENT_CONCURRENCY_MAX,
+            tolerance=AGENT_LATENCY_TOLERANCE,
+        )
+    return _limiter
+
+
+_single_flight = None
+
+
+def get_single_flight():
+    """The process-wide coalescing of identical agent calls, or None when COALESCE is off."""
+    global _single_flight
+    if _single_flight is None and COALESCE:
+        from services.single_flight import SingleFlight
+        _single_flight = SingleFlight(linger=COALESCE_LINGER)
+    return _single_flight
+
+
+_spool = None
+
+
+def get_spool():
+    """The response spool, or None when SPOOL_DIR is empty."""
+    global _spool
+    if _spool is None and SPOOL_DIR:
+        from services.spool import Spool
+        try:
+            _spool = Spool(SPOOL_DIR)
+            # A partial body older than any run can last was left by a killed one
+            _spool.remove_stale(RUN_DEADLINE or 24 * 3600)
+        except OSError as e:
+            logger.warning(f"⚠️ Response spool {SPOOL_DIR} unavailable: {e}")
+    return _spool
+
+
+def start_spool(request_body: dict, body: bytes) -> asyncio.Future | None:
+    """
+    Spool a buffered response body in the default thread pool. Submitted right
+    away, so the gzip work (which releases the GIL) overlaps the JSON parse.
+    """
+    spool = get_spool()
+    if spool is None:
+        return None
+    return asyncio.get_running_loop().run_in_executor(
+        None, spool.write, request_body["session_id"], request_body["user_id"], body
+    )
+
+
+async def finish_spool(spooled: asyncio.Future | None, request_body: dict, timer: Timer):
+    # A spool failure is logged, not fatal: the response itself is still ingested
+    if spooled is None:
+        return
+    try:
+        with timer.span("spool"):
+            await spooled
+    except Exception as e:
+        logger.warning(f"⚠️ Could not spool response for session_id={request_body['session_id']}: {e}")
 
-async def run_job():
-    # Connect to MongoDB
-    mongo_client = AsyncIOMotorClient(MONGO_URI)
-    db = mongo_client[DB_NAME]
-    await init_beanie(database=db, document_models=[News, AgentCallLog])
 
+async def drain(chunks):
+    # Read the rest of a teed stream so the spool (and cache) get the complete body
+    try:
+        async for _ in chunks:
+            pass
+    except Exception as e:
+        logger.warning(f"⚠️ Could not read the full response: {e}")
+    finally:
+        await chunks.aclose()
+
+
+async def capture(chunks, into: list[bytes]):
+    # Pass a stream through, keeping its chunks for the response cache
+    async for chunk in chunks:
+        into.append(chunk)
+        yield chunk
+
+
+_response_cache = None
+
+
+def get_response_cache():
+    """
+    The process-wide agent response cache (it tracks the collection's size
+    across calls), or None when RESPONSE_CACHE_TTL is 0. Needs init_db.
+    """
+    global _response_cache
+    if not RESPONSE_CACHE_TTL:
+        return None
+    from models.agent_response_cache import AgentResponseCache
+    from services.response_cache import ResponseCache
+
+    collection = AgentResponseCache.get_motor_collection()
+    if _response_cache is not None and _response_cache.collection is collection:
+        return _response_cache
+    _response_cache = ResponseCache(
+        collection,
+        ttl=RESPONSE_CACHE_TTL,
+        max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+        max_bytes=int(RESPONSE_CACHE_MAX_MB * 1024 * 1024) if RESPONSE_CACHE_MAX_MB else None,
+    )
+    return _response_cache
+
+
+async def store_response(cache, key: str | None, request_body: dict, preference: str | None, body: bytes, report):
+    # Only responses that had news and were fully ingested are worth serving again
+    # (invalid articles would be skipped again, so they don't count against it)
+    if cache is None or not report.total or report.write_failed:
+        return
+    try:
+        stored = await cache.put(
+            key, body, user_id=request_body["user_id"], query=request_body["query"],
+            model_name=request_body["model_name"], preference=preference,
+        )
+    except Exception as e:
+        logger.warning(f"⚠️ Could not cache the response: {e}")
+        return
+    if stored:
+        metrics.RESPONSE_CACHE.inc(result="store")
+
+
+def release_spool(request_body: dict, report):
+    # Every valid article is stored (or was already): the spooled body is no longer needed
+    spool = get_spool()
+    if spool is not None and not report.write_failed:
+        spool.discard(request_body["session_id"], request_body["user_id"])
+
+
+def report_status(report) -> str:
+    """Log a BulkInsertReport and map it to an AgentCallLog status."""
+    if report.total == 0:
+        logger.warning("No 'news' field found in the API response.")
+        return "fail"
+    if report.failed:
+        logger.warning(
+            f"⚠️ {report.failed}/{report.total} articles failed "
+            f"across {len(report.chunks)} chunks."
+        )
+        return "partial"
+    logger.info(
+        f"✅ {report.inserted} news inserted, "
+        f"{report.duplicates} already stored."
+    )
+    return "pass"
+
+
+def new_session_id() -> str:
     # Generate new session_id using UTC-aware timestamp
-    session_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
-    start_time = datetime.now(timezone.utc)
+    return datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+
+
+DB_STACK_MODULES = (
+    "motor.motor_asyncio",
+    "beanie",
+    "models.agent_call_log",
+    "models.agent_response_cache",
+    "models.circuit_breaker",
+    "models.job",
+    "models.news",
+    "models.run_lock",
+    "services.indexes",
+)
+
+
+def import_db_stack():
+    for name in DB_STACK_MODULES:
+        importlib.import_module(name)
+
 
-    logger.info(f"Starting API call, session_id={session_id}")
+def document_models() -> list:
+    from models.agent_call_log import AgentCallLog
+    from models.agent_response_cache import AgentResponseCache
+    from models.circuit_breaker import CircuitBreakerState
+    from models.job import Job
+    from models.news import News
+    from models.run_lock import RunLock
 
-    # Prepare request body
-    request_body = {
+    return [News, AgentCallLog, RunLock, Job, CircuitBreakerState, AgentResponseCache]
+
+
+async def init_db(timer: Timer | None = None, on_connect=None) -> AsyncIOMotorClient:
+    """Connect, initialise Beanie and ensure indexes; `on_connect(db)` is called once MongoDB answers."""
+    timer = timer or Timer()
+
+    # Import in a worker thread so a background setup doesn't stall the event loop
+    # (and an agent request already in flight) on the motor/beanie/pydantic imports
+    with timer.span("import_db_stack"):
+        await asyncio.to_thread(import_db_stack)
+
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from beanie import init_beanie
+    from services.indexes import ensure_indexes
+
+    # Connect to MongoDB
+    with timer.span("mongo_connect"):
+        mongo_client = AsyncIOMotorClient(MONGO_URI)
+        db = mongo_client[DB_NAME]
+        await db.command("ping")
+    if on_connect is not None:
+        on_connect(db)
+
+    # Dedup and job uniqueness (and TTL cleanup) depend on their indexes, so those are
+    # always ensured; the secondary ones only with ENSURE_INDEXES, to skip the round trips
+    with timer.span("init_beanie"):
+        await init_beanie(database=db, document_models=document_models(), skip_indexes=True)
+    with timer.span("ensure_indexes"):
+        summary = await ensure_indexes(document_models(), required_only=not ENSURE_INDEXES)
+    for collection, result in summary.items():
+        if result["failed"]:
+            logger.error(
+                f"❌ Required index(es) {', '.join(result['failed'])} missing on {collection}: "
+                f"{'articles will be stored more than once' if collection == 'news' else 'uniqueness is not enforced'}"
+            )
+    return mongo_client
+
+
+def make_http_client() -> httpx.AsyncClient:
+    import httpx
+
+    # One pooled client per process; keep-alive connections are reused across calls
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(None, connect=HTTP_CONNECT_TIMEOUT, read=HTTP_READ_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_CONNECTIONS,
+        ),
+    )
+
+
+class PendingDb:
+    """Mongo/Beanie setup running in the background while the agent call is in flight."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timer = Timer()
+        self.init_time = 0.0
+        self.max_wait = 0.0  # longest time any caller was blocked on the setup
+        self.timer_claimed = False
+        self.connected = asyncio.get_running_loop().create_future()  # the database, before Beanie is ready
+        self.task = asyncio.create_task(self._init())
+
+    async def _init(self) -> AsyncIOMotorClient:
+        mongo_client = await init_db(self.timer, on_connect=self.connected.set_result)
+        self.init_time = time.perf_counter() - self.started
+        return mongo_client
+
+    async def wait(self) -> AsyncIOMotorClient:
+        started = time.perf_counter()
+        mongo_client = await self.task
+        self.max_wait = max(self.max_wait, time.perf_counter() - started)
+        return mongo_client
+
+    async def database(self):
+        """The database as soon as MongoDB answers, for plain motor queries that don't need Beanie."""
+        started = time.perf_counter()
+        await asyncio.wait([self.connected, self.task], return_when=asyncio.FIRST_COMPLETED)
+        self.max_wait = max(self.max_wait, time.perf_counter() - started)
+        if not self.connected.done():
+            await self.task  # failed before connecting: raises why
+        return self.connected.result()
+
+    def claim_timer(self) -> Timer | None:
+        """The setup's stage timings, for the first caller only: fanned-out calls share one setup."""
+        if self.timer_claimed:
+            return None
+        self.timer_claimed = True
+        return self.timer
+
+
+async def wait_db(db_ready: PendingDb | None, timer: Timer):
+    """Block until a background Mongo setup (if any) is done."""
+    if db_ready is None:
+        return
+    with timer.span("db_wait"):
+        await db_ready.wait()
+
+
+def streaming_available() -> bool:
+    # ijson is optional; checked without importing the streaming (beanie) stack
+    return importlib.util.find_spec("ijson") is not None
+
+
+def build_request_body(session_id: str, user_id: str = USER_ID, query: str = QUERY) -> dict:
+    return {
         "app_name": APP_NAME,
         "model_name": MODEL_NAME,
-        "user_id": USER_ID,
+        "user_id": user_id,
         "session_id": session_id,
-        "query": QUERY,
+        "query": query,
     }
 
+
+async def fetch_and_ingest(
+    client_http: httpx.AsyncClient,
+    request_body: dict,
+    attempts: list[AttemptRecord],
+    timer: Timer,
+    deadline: float | None = None,
+    db_ready: PendingDb | None = None,
+    store=None,
+    on_body=None,
+    sizes: TransferSizes | None = None,
+):
+    """
+    POST to the agent (with retries) and upsert the returned news.
+
+    `db_ready` is an optional PendingDb for a Mongo setup still in flight; it
+    is only waited on once there is something to write. Stage spans (connect,
+    ttfb, download, parse, build_docs, bulk_write, ...) go to `timer`.
+    `store(body, report)`, if given, is awaited with the complete body once it
+    was ingested (for the response cache). `on_body(body)` is called as soon as
+    the complete body is known: before ingestion when buffered, after it when
+    streaming. A streamed body that isn't received within the attempt's
+    timeout is retried like an attempt that got no response.
+    `sizes` (a TransferSizes) is kept up to date as the request is sent and
+    the response received, also when this raises.
+    Returns the BulkInsertReport.
+    """
+    from services.agent_client import (
+        AgentCallError, BodyTimeout, TransferSizes, body_timeout, read_within, send_with_retries,
+    )
+
+    logger.info(f"Calling API: {NEWS_API_URL}")
+    trace = http_trace(timer)
+    policy = retry_policy()
+    sizes = sizes if sizes is not None else TransferSizes()
+
+    while STREAM_PARSE and streaming_available():  # loops only to retry a body that timed out
+        # Parse and upsert while the body is still downloading
+        resp = await send_with_retries(
+            client_http, NEWS_API_URL, request_body, policy, attempts,
+            stream=True, deadline=deadline, trace=trace, limiter=get_limiter(), sizes=sizes,
+        )
+        reader = None
+        try:
+            if resp.is_error:
+                await resp.aread()
+                sizes.response = len(resp.content)
+            resp.raise_for_status()
+            await wait_db(db_ready, timer)
+            from services.news_stream import AsyncByteReader, ingest_news_stream
+
+            logger.info("Streaming news into MongoDB...")
+            spool = get_spool()
+            # The attempt's timeout covers the body too, not just the headers
+            chunks = read_within(resp.aiter_bytes(), body_timeout(policy, attempts[-1]))
+            captured = [] if store is not None or on_body is not None else None
+            if captured is not None:
+                chunks = capture(chunks, captured)
+            if spool is not None:
+                chunks = spool.tee(request_body["session_id"], request_body["user_id"], chunks)
+            reader = AsyncByteReader(chunks)
+            try:
+                report = await ingest_news_stream(
+                    reader, chunk_size=BULK_CHUNK_SIZE, timer=timer,
+                    writers=INGEST_WRITERS, queue_depth=INGEST_QUEUE_DEPTH,
+                )
+            except Exception:
+                if spool is not None:
+                    await drain(chunks)
+                raise
+            if spool is not None or captured is not None:
+                await drain(chunks)
+            if spool is not None:
+                release_spool(request_body, report)
+            if captured is not None:
+                body = b"".join(captured)
+                if on_body is not None:
+                    on_body(body)
+                if store is not None:
+                    await store(body, report)
+            return report
+        except BodyTimeout as e:
+            # Retried like a timeout before the headers; what was ingested is matched as duplicates
+            last = attempts[-1]
+            last.outcome, last.error = "timeout", str(e)
+            delay = policy.backoff(last.attempt)
+            if last.attempt > policy.retries or (deadline is not None and time.monotonic() + delay >= deadline):
+                raise AgentCallError(f"Agent call failed after {len(attempts)} attempt(s): {e}") from None
+            logger.warning(f"⚠️ Agent attempt {last.attempt} failed ({e}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        finally:
+            if reader is not None:
+                sizes.response = reader.bytes_read
+            sizes.wire = resp.num_bytes_downloaded
+            await resp.aclose()
+
+    if STREAM_PARSE:
+        logger.warning("STREAM_PARSE requested but ijson is not installed; buffering response.")
+    resp = await send_with_retries(
+        client_http, NEWS_API_URL, request_body, policy, attempts,
+        deadline=deadline, trace=trace, limiter=get_limiter(), sizes=sizes,
+    )
+    # Response size from the bytes received, not a re-serialization
+    sizes.response, sizes.wire = len(resp.content), resp.num_bytes_downloaded
+
+    # Raise for status to catch HTTP errors
+    resp.raise_for_status()
+    if on_body is not None:
+        on_body(resp.content)
+    report = await ingest_body(request_body, resp.content, timer, db_ready)
+    if store is not None:
+        await store(resp.content, report)
+    return report
+
+
+async def ingest_body(request_body: dict, body: bytes, timer: Timer, db_ready: PendingDb | None = None, spool=True):
+    """Parse a buffered response body and upsert its news, spooling it meanwhile unless `spool` is False."""
+    spooled = start_spool(request_body, body) if spool else None
+    try:
+        with timer.span("parse"):
+            data = json_backend.loads(body)
+    finally:
+        await finish_spool(spooled, request_body, timer)
+    await wait_db(db_ready, timer)
+    from services.news_service import insert_news_from_api_response
+
+    logger.info("Inserting news into MongoDB...")
+    report = await insert_news_from_api_response(
+        data or {}, chunk_size=BULK_CHUNK_SIZE, timer=timer,
+        writers=INGEST_WRITERS, queue_depth=INGEST_QUEUE_DEPTH,
+    )
+    if spool:
+        release_spool(request_body, report)
+    return report
+
+
+def make_breaker(db=None):
+    """The agent's breaker, on `db` when given (a motor database Beanie may not be initialised on yet)."""
+    from models.circuit_breaker import CircuitBreakerState
+    from services.circuit_breaker import CircuitBreaker
+
+    return CircuitBreaker(
+        db[CircuitBreakerState.Settings.name] if db is not None else CircuitBreakerState.get_motor_collection(),
+        NEWS_API_URL,
+        failure_threshold=BREAKER_FAILURES,
+        latency_threshold=BREAKER_LATENCY,
+        reset_timeout=BREAKER_RESET,
+        probe_timeout=RUN_DEADLINE or TIMEOUT or 900,
+    )
+
+
+async def check_breaker(db_ready: PendingDb | None, timer: Timer):
+    """
+    (breaker, permit) for one agent call; raises CircuitOpenError when it
+    should fail fast. Only waits for the connection of a setup still in
+    flight, not for Beanie and the indexes.
+    """
+    db = None
+    if db_ready is not None:
+        with timer.span("db_wait"):
+            db = await db_ready.database()
+    breaker = make_breaker(db)
+    return breaker, await breaker.allow()
+
+
+async def record_breaker(breaker, permit, attempts: list[AttemptRecord]):
+    """Report the agent's last attempt to the breaker; a call that never reached it reports nothing."""
+    from services.agent_client import limiter_signal
+    from services.limiter import OK
+
+    if not attempts:
+        return
+    last = attempts[-1]
+    try:
+        await breaker.record(permit, ok=limiter_signal(last) == OK, latency=last.latency)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not update the circuit breaker: {e}")
+
+
+async def run_agent_call(
+    client_http: httpx.AsyncClient,
+    session_id: str,
+    user_id: str = USER_ID,
+    query: str = QUERY,
+    preference: str | None = None,
+    parent_session_id: str | None = None,
+    db_ready: PendingDb | None = None,
+) -> str:
+    """
+    Call the agent once, ingest its news and log the call. Returns the status.
+    See fetch_and_ingest for `db_ready`. With CIRCUIT_BREAKER the call fails
+    fast while the breaker is open (checked before the call is sent, as soon
+    as MongoDB is connected), and with RESPONSE_CACHE_TTL a cached response
+    is ingested instead of calling the agent, which needs the setup up front. With COALESCE, a call for a preference joins an identical
+    call already in flight in this process and ingests its response.
+    """
+    import httpx
+    from services.agent_client import TransferSizes
+    from services.circuit_breaker import CircuitOpenError
+    from services.single_flight import SharedCallError
+
+    start_time = datetime.now(timezone.utc)
+
+    logger.info(f"Starting API call, user_id={user_id}, session_id={session_id}")
+
+    request_body = build_request_body(session_id, user_id, query)
+
     # Variables for logging
     status = "fail"
-    response_size = 0
+    sizes = TransferSizes()  # filled in as they are known, so failed calls log them too
+    articles_total = None
+    articles_inserted = None
+    articles_duplicate = None
+    articles_failed = None
+    attempts: list[AttemptRecord] = []
+    timer = Timer()
     error_message = None
+    breaker = permit = None
+    cache_hit = False
+    coalesced_with = None
+    flight = get_single_flight() if preference else None
+    flight_key = leading = None
+    if flight is not None:
+        from services.single_flight import coalesce_key
+
+        flight_key = coalesce_key(preference, MODEL_NAME, query)
 
     try:
-        # Call the API (no timeout)
-        async with httpx.AsyncClient(timeout=None) as client_http:
-            logger.info(f"Calling API: {NEWS_API_URL}")
-            resp = await client_http.post(NEWS_API_URL, json=request_body)
+        cache = None
+        store_body = None
+        if RESPONSE_CACHE_TTL:
+            from services.response_cache import cache_key
 
-            # Raise for status to catch HTTP errors
-            resp.raise_for_status()
-            data = resp.json()
+            await wait_db(db_ready, timer)
+            cache = get_response_cache()
+            if flight_key is not None:
+                # Coalesced calls share one response whatever the user, so they share its cache entry too
+                key = cache_key(APP_NAME, None, flight_key, MODEL_NAME)
+            else:
+                key = cache_key(APP_NAME, user_id, query, MODEL_NAME, preference)
+            with timer.span("cache_lookup"):
+                cached = await cache.get(key)
+            cache_hit = cached is not None
+            metrics.RESPONSE_CACHE.inc(result="hit" if cache_hit else "miss")
 
-            # Calculate response size in bytes
-            response_size = len(json.dumps(data).encode("utf-8"))
+            async def store_cached(body: bytes, report):
+                await store_response(cache, key, request_body, preference, body, report)
 
-            # Process and insert data
-            if not data:
-                logger.warning("No 'news' field found in the API response.")
-            else:
-                logger.info("Inserting news into MongoDB...")
-                await insert_news_from_api_response(data)
-                logger.info("✅ News inserted successfully.")
-                status = "pass"
+            store_body = store_cached
+
+        shared = None
+        if flight is not None and not cache_hit:
+            shared = flight.join(flight_key)
+            if shared is None:
+                leading = flight.lead(flight_key)
+
+        if cache_hit:
+            logger.info(f"📦 Cached agent response for user_id={user_id}, skipping the agent call")
+            report = await ingest_body(request_body, cached, timer, spool=False)
+            sizes.response = len(cached)
+        elif shared is not None:
+            logger.info(f"🔗 Joining an identical agent call in flight for preference={preference!r}")
+            with timer.span("coalesce_wait"):
+                body, coalesced_with = await asyncio.wait_for(asyncio.shield(shared), RUN_DEADLINE)
+            metrics.COALESCED_CALLS.inc()
+            # Not stored again: the leader stores it under the same key
+            report = await ingest_body(request_body, body, timer, db_ready, spool=False)
+            sizes.response = len(body)
+        else:
+            deadline = time.monotonic() + RUN_DEADLINE if RUN_DEADLINE else None
+            share_body = None
+            if leading is not None:
+                def resolve_flight(body: bytes):
+                    flight.resolve(flight_key, leading, (body, {"session_id": session_id, "user_id": user_id}))
+
+                share_body = resolve_flight
+
+            if CIRCUIT_BREAKER:
+                breaker, permit = await check_breaker(db_ready, timer)
+            report = await asyncio.wait_for(
+                fetch_and_ingest(client_http, request_body, attempts, timer, deadline, db_ready, store_body, share_body, sizes),
+                RUN_DEADLINE,
+            )
+
+        articles_total = report.total
+        articles_inserted = report.inserted
+        articles_duplicate = report.duplicates
+        articles_failed = report.failed
+        status = report_status(report)
+
+    except CircuitOpenError as e:
+        error_message = str(e)
+        logger.error(f"⛔ {error_message}, failing fast")
+
+    except SharedCallError as e:
+        error_message = str(e)
+        logger.error(f"❌ {error_message}")
 
     except httpx.HTTPStatusError as e:
         error_message = f"HTTP {e.response.status_code}: {e.response.text}"
         logger.error(f"❌ Server returned {e.response.status_code}: {e.response.text}")
 
+    except asyncio.TimeoutError:
+        error_message = f"Run deadline of {RUN_DEADLINE:g}s exceeded"
+        logger.error(f"❌ {error_message}")
+
+    except asyncio.CancelledError as e:
+        # Still logged below, e.g. when the run lock was lost mid-call
+        error_message = f"Cancelled: {e}" if str(e) else "Cancelled"
+        raise
+
     except Exception as e:
         error_message = str(e)
         logger.exception(f"❌ Error in cron job: {e}")
 
     finally:
+        if leading is not None and not leading.done():
+            # Callers that joined this call fail with it instead of waiting for their deadline
+            flight.fail(flight_key, leading, SharedCallError(f"Shared agent call failed: {error_message or 'cancelled'}"))
         end_time = datetime.now(timezone.utc)
         total_time_taken = (end_time - start_time).total_seconds()
+        if permit is not None:
+            await record_breaker(breaker, permit, attempts)
+
+        # Log the call details in MongoDB (the setup may still be running if the call failed fast)
+        await wait_db(db_ready, timer)
+        from models.agent_call_log import AgentCallLog
+        setup_timer = db_ready.claim_timer() if db_ready is not None else None
+        if setup_timer is not None:
+            timer.merge(setup_timer)
+        logger.info(f"⏱️ Stages: {timer.summary()}")
+
+        metrics.RUNS.inc(status=status)
+        metrics.RUN_DURATION.observe(total_time_taken, status=status)
+        metrics.LAST_RUN.set(end_time.timestamp(), status=status)
+        for attempt in attempts:
+            metrics.AGENT_LATENCY.observe(attempt.latency, outcome=attempt.outcome)
 
-        # Log the call details in MongoDB
         await AgentCallLog(
             session_id=session_id,
+            user_id=user_id,
+            parent_session_id=parent_session_id,
+            preference=preference,
             start_timestamp=start_time,
             end_timestamp=end_time,
             status=status,
             total_time_taken=total_time_taken,
-            response_size=response_size,
+            request_size=sizes.request,
+            response_size=sizes.response,
+            response_wire_size=sizes.wire,
+            articles_total=articles_total if articles_total is not None else timer.counts.get("articles"),
+            articles_inserted=articles_inserted,
+            articles_duplicate=articles_duplicate,
+            articles_failed=articles_failed,
+            attempts=[a.to_dict() for a in attempts],
+            stage_timings=timer.stages,
+            breaker_transitions=permit.transitions if permit is not None else [],
+            cache_hit=cache_hit,
+            coalesced_with=coalesced_with,
             error_message=error_message
         ).insert()
 
         logger.info(
-            f"📄 Logged API call: session_id={session_id}, status={status}, "
-            f"duration={total_time_taken:.2f}s, size={response_size} bytes"
+            f"📄 Logged API call: session_id={session_id}, status={status}{' (cached)' if cache_hit else ''}, "
+            f"duration={total_time_taken:.2f}s, attempts={len(attempts)}, "
+            f"request={sizes.request} bytes, response={sizes.response} bytes ({sizes.wire} on the wire)"
         )
 
+    return status
+
+
+async def load_preferences() -> list[str]:
+    if PREFERENCES:
+        return PREFERENCES
+    from models.news import News
+    return sorted(p for p in await News.distinct("preference_name") if p)
+
+
+async def run_fanout(
+    client_http: httpx.AsyncClient,
+    parent_session_id: str,
+    user_id: str = USER_ID,
+    preferences: list[str] | None = None,
+    db_ready: PendingDb | None = None,
+) -> list[str]:
+    """Issue one agent call per preference, at most FANOUT_CONCURRENCY at a time."""
+    if not preferences:
+        await wait_db(db_ready, Timer())
+        preferences = await load_preferences()
+    if not preferences:
+        logger.warning("No preferences configured or stored; nothing to fan out.")
+        return []
+
+    logger.info(
+        f"Fanning out {len(preferences)} preferences, parent_session_id={parent_session_id}, "
+        f"concurrency={FANOUT_CONCURRENCY}"
+    )
+    semaphore = asyncio.Semaphore(FANOUT_CONCURRENCY)
+
+    async def call(index: int, preference: str) -> str:
+        async with semaphore:
+            return await run_agent_call(
+                client_http,
+                session_id=f"{parent_session_id}-{index}",
+                user_id=user_id,
+                query=f"{QUERY}: {preference}",
+                preference=preference,
+                parent_session_id=parent_session_id,
+                db_ready=db_ready,
+            )
+
+    statuses = await asyncio.gather(*(call(i, p) for i, p in enumerate(preferences)))
+    passed = statuses.count("pass")
+    logger.info(f"Fan-out finished: {passed}/{len(statuses)} preferences passed")
+    return statuses
+
+
+async def log_skipped_run(session_id: str, user_id: str, reason: str) -> str:
+    from models.agent_call_log import AgentCallLog
+
+    now = datetime.now(timezone.utc)
+    metrics.RUNS.inc(status="skipped")
+    await AgentCallLog(
+        session_id=session_id,
+        user_id=user_id,
+        start_timestamp=now,
+        end_timestamp=now,
+        status="skipped",
+        total_time_taken=0.0,
+        response_size=0,
+        error_message=reason,
+    ).insert()
+    logger.warning(f"⏭️ Skipped run for user_id={user_id}: {reason}")
+    return "skipped"
+
+
+async def run_user(
+    client_http: httpx.AsyncClient, target: UserTarget, db_ready: PendingDb | None = None
+) -> list[str]:
+    """
+    Run the agent for one user: fanned out when it has preferences or FANOUT is set.
+    With RUN_LOCK, the run holds a lease on (APP_NAME, user) and is skipped if
+    another process or host holds it; if the lease is lost while running
+    (e.g. a stalled heartbeat let it expire), the run is cancelled.
+    """
+    session_id = new_session_id()
+
+    async def run() -> list[str]:
+        if target.preferences or FANOUT:
+            return await run_fanout(client_http, session_id, target.user_id, target.preferences, db_ready)
+        return [await run_agent_call(client_http, session_id, user_id=target.user_id, db_ready=db_ready)]
+
+    if not RUN_LOCK:
+        return await run()
+
+    from models.run_lock import RunLock
+    from services.leases import Lease
+
+    # The lease lives in MongoDB, so this run can't overlap the setup with the agent call
+    if db_ready is not None:
+        await db_ready.wait()
+    lease = Lease(RunLock.get_motor_collection(), f"{APP_NAME}:{target.user_id}", ttl=RUN_LOCK_TTL)
+    if not await lease.acquire(wait=RUN_LOCK_WAIT):
+        return [await log_skipped_run(session_id, target.user_id, f"run lock {lease.key} held by {lease.holder}")]
+
+    task = asyncio.create_task(run())
+    lease.on_lost = lambda: task.cancel(f"run lock {lease.key} was lost to another owner")
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if not lease.lost or asyncio.current_task().cancelling():
+            raise
+        logger.error(f"❌ Run {session_id} for user_id={target.user_id} aborted: run lock {lease.key} was lost")
+        return ["fail"]
+    finally:
+        await lease.release()
+
+
+async def run_job():
+    # Start Mongo/Beanie setup in the background; the agent call doesn't need it until ingestion
+    db_ready = PendingDb()
+
+    try:
+        async with make_http_client() as client_http:
+            await run_user(client_http, UserTarget(user_id=USER_ID), db_ready=db_ready)
+    finally:
+        mongo_client = await db_ready.wait()
+        logger.info(
+            f"⏱️ Startup overlap: mongo_init={db_ready.init_time:.3f}s, blocked on it "
+            f"{db_ready.max_wait:.3f}s, saved ~{db_ready.init_time - db_ready.max_wait:.3f}s of wall time"
+        )
         # Explicitly close Mongo connection
         mongo_client.close()
+        flush_metrics()
+
+
+def flush_metrics():
+    """One-shot modes have no scrape endpoint; hand the metrics to the textfile collector."""
+    if METRICS_TEXTFILE:
+        metrics.write_textfile(METRICS_TEXTFILE)
+        logger.info(f"📈 Metrics written to {METRICS_TEXTFILE}")
+
+
+async def load_users(mongo_client: AsyncIOMotorClient, users_file: str | None) -> list[UserTarget]:
+    if users_file:
+        return load_users_file(users_file)
+    return await load_users_collection(mongo_client[DB_NAME], BATCH_USERS_COLLECTION)
+
+
+async def run_users(client_http: httpx.AsyncClient, users: list[UserTarget], concurrency: int):
+    """Run many users concurrently over the shared clients, at most `concurrency` at a time."""
+    if not users:
+        logger.warning("No users to run.")
+        return
+
+    logger.info(f"Running batch of {len(users)} users, concurrency={concurrency}")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(target: UserTarget) -> list[str]:
+        async with semaphore:
+            try:
+                return await run_user(client_http, target)
+            except Exception as e:
+                logger.exception(f"❌ Batch run failed for user_id={target.user_id}: {e}")
+                return ["fail"]
+
+    results = await asyncio.gather(*(run_one(u) for u in users))
+    passed = sum(1 for statuses in results if statuses and all(s == "pass" for s in statuses))
+    logger.info(f"Batch finished: {passed}/{len(users)} users passed")
+
+
+async def run_batch(users_file: str | None = None, concurrency: int = BATCH_CONCURRENCY):
+    """
+    Run many users in one event loop, sharing one Mongo client and one pooled
+    httpx client. Users come from `users_file`, or from BATCH_USERS_COLLECTION.
+    """
+    mongo_client = await init_db()
+
+    try:
+        users = await load_users(mongo_client, users_file)
+        async with make_http_client() as client_http:
+            await run_users(client_http, users, concurrency)
+    finally:
+        mongo_client.close()
+        flush_metrics()
+
+
+async def run_daemon(
+    interval: float | None = SCHEDULE_INTERVAL,
+    cron_expr: str | None = SCHEDULE_CRON,
+    batch: bool = False,
+    users_file: str | None = None,
+    concurrency: int = BATCH_CONCURRENCY,
+):
+    """
+    Long-running mode: Mongo, Beanie and the httpx pool are set up once and
+    reused by every scheduled run. SIGTERM/SIGINT stop scheduling and let the
+    current run finish (up to SHUTDOWN_GRACE seconds).
+    """
+    schedule = build_schedule(interval, cron_expr)
+    mongo_client = await init_db()
+    scheduler = Scheduler(grace_seconds=SHUTDOWN_GRACE)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, scheduler.stop)
+    metrics_server = await metrics.start_http_server(METRICS_PORT) if METRICS_PORT else None
+
+    try:
+        async with make_http_client() as client_http:
+            async def tick():
+                if batch:
+                    users = await load_users(mongo_client, users_file)
+                    await run_users(client_http, users, concurrency)
+                else:
+                    await run_user(client_http, UserTarget(user_id=USER_ID))
+
+            scheduler.add_job("news", schedule, tick)
+            await scheduler.run()
+    finally:
+        logger.info("🛑 Daemon stopped")
+        if metrics_server is not None:
+            metrics_server.close()
+        mongo_client.close()
+
+
+def overall_status(statuses: list[str]) -> str:
+    """One status for a user's run (several statuses when fanned out)."""
+    if statuses and all(status == "pass" for status in statuses):
+        return "pass"
+    if statuses and all(status == "skipped" for status in statuses):
+        return "skipped"
+    return "fail" if "fail" in statuses or not statuses else "partial"
+
+
+async def run_enqueue(users_file: str | None = None, interval: float = JOB_INTERVAL):
+    """Register a recurring job per user (and preference set) in the jobs collection."""
+    from models.job import Job
+    from services.job_queue import enqueue, job_key
+
+    mongo_client = await init_db()
+    try:
+        users = await load_users(mongo_client, users_file)
+        collection = Job.get_motor_collection()
+        created = 0
+        for target in users:
+            key = job_key(APP_NAME, target.user_id, target.preferences)
+            created += await enqueue(collection, key, target.user_id, target.preferences, interval)
+    finally:
+        mongo_client.close()
+    logger.info(f"✅ Enqueued {len(users)} job(s): {created} new, {len(users) - created} already queued")
+
+
+async def run_worker(concurrency: int = WORKER_CONCURRENCY):
+    """
+    Claim and run queued jobs until SIGTERM/SIGINT. Run as many workers, on as
+    many hosts, as needed; each job runs on one worker at a time.
+    """
+    from models.job import Job
+    from services.job_queue import JobWorker
+
+    mongo_client = await init_db()
+    metrics_server = await metrics.start_http_server(METRICS_PORT) if METRICS_PORT else None
+
+    try:
+        async with make_http_client() as client_http:
+            async def handle(job: dict) -> str:
+                target = UserTarget(user_id=job["user_id"], preferences=job.get("preferences") or [])
+                return overall_status(await run_user(client_http, target))
+
+            worker = JobWorker(
+                Job.get_motor_collection(), handle, concurrency=concurrency,
+                lease_seconds=JOB_LEASE, poll_interval=JOB_POLL_INTERVAL,
+            )
+            loop = asyncio.get_running_loop()
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.add_signal_handler(sig, worker.stop)
+            await worker.run(grace_seconds=SHUTDOWN_GRACE)
+    finally:
+        if metrics_server is not None:
+            metrics_server.close()
+        mongo_client.close()
+        flush_metrics()
+
+
+async def replay_entry(spool, entry) -> str:
+    """Ingest one spooled response and log it as a new run, replayed_from entry.session_id."""
+    from models.agent_call_log import AgentCallLog
+    from services.news_service import insert_news_from_api_response
+
+    start_time = datetime.now(timezone.utc)
+    # Replays started within the same second still get distinct session ids
+    session_id = f"{new_session_id()}-{uuid.uuid4().hex[:8]}"
+    logger.info(f"Replaying session_id={entry.session_id}, user_id={entry.user_id} as session_id={session_id}")
+    status = "fail"
+    response_size = 0
+    report = None
+    timer = Timer()
+    error_message = None
+
+    try:
+        body = await asyncio.to_thread(spool.read, entry)
+        response_size = len(body)
+        with timer.span("parse"):
+            data = json_backend.loads(body)
+        report = await insert_news_from_api_response(
+            data or {}, chunk_size=BULK_CHUNK_SIZE, timer=timer,
+            writers=INGEST_WRITERS, queue_depth=INGEST_QUEUE_DEPTH,
+        )
+        status = report_status(report)
+        if not report.write_failed:
+            spool.discard(entry.session_id, entry.user_id)
+    except Exception as e:
+        error_message = str(e)
+        logger.exception(f"❌ Replay of session_id={entry.session_id} failed: {e}")
+
+    end_time = datetime.now(timezone.utc)
+    await AgentCallLog(
+        session_id=session_id,
+        user_id=entry.user_id,
+        replayed_from=entry.session_id,
+        start_timestamp=start_time,
+        end_timestamp=end_time,
+        status=status,
+        total_time_taken=(end_time - start_time).total_seconds(),
+        response_size=response_size,
+        articles_total=report.total if report else timer.counts.get("articles"),
+        articles_inserted=report.inserted if report else None,
+        articles_duplicate=report.duplicates if report else None,
+        articles_failed=report.failed if report else None,
+        stage_timings=timer.stages,
+        error_message=error_message,
+    ).insert()
+    return status
+
+
+async def run_replay(session_ids: list[str] | None = None):
+    """
+    Ingest spooled responses (all of them, or those of `session_ids`) without
+    calling the agent. Fully ingested ones are removed from the spool.
+    """
+    spool = get_spool()
+    if spool is None:
+        logger.error("❌ SPOOL_DIR is not set; nothing to replay")
+        return
+    entries = [e for e in spool.entries() if not session_ids or e.session_id in session_ids]
+    if not entries:
+        logger.info(f"Nothing to replay in {SPOOL_DIR}")
+        return
+
+    mongo_client = await init_db()
+    try:
+        statuses = [await replay_entry(spool, entry) for entry in entries]
+    finally:
+        mongo_client.close()
+        flush_metrics()
+    logger.info(
+        f"🔁 Replayed {len(statuses)} response(s): "
+        + ", ".join(f"{status}={statuses.count(status)}" for status in sorted(set(statuses)))
+    )
+
+
+async def run_backfill(
+    patterns: list[str],
+    workers: int | None = None,
+    checkpoint_path: str | None = BACKFILL_CHECKPOINT,
+    restart: bool = False,
+):
+    """Ingest agent-response files (plain or gzipped, e.g. spooled ones) without calling the agent."""
+    from services.backfill import Checkpoint, backfill, expand_paths
+
+    paths = expand_paths(patterns)
+    if not paths:
+        logger.error("❌ No input files")
+        return
+    if restart and checkpoint_path and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    checkpoint = Checkpoint(checkpoint_path) if checkpoint_path else None
+
+    logger.info(f"Backfilling {len(paths)} file(s)")
+    mongo_client = await init_db()
+    timer = Timer()
+    try:
+        progress = await backfill(
+            paths, checkpoint, workers=workers, chunk_size=BULK_CHUNK_SIZE,
+            writers=INGEST_WRITERS, queue_depth=INGEST_QUEUE_DEPTH, timer=timer,
+        )
+    finally:
+        mongo_client.close()
+        flush_metrics()
+    logger.info(f"⏱️ Stages: {timer.summary()}")
+    logger.info(f"✅ Backfill finished in {progress.elapsed:.1f}s: {progress.summary()}")
+
+
+def check_config(interval: float | None = None, cron_expr: str | None = None) -> bool:
+    """Validate the environment (and schedule, if given) without importing the heavy stack."""
+    ok = True
+    missing_vars = missing_config()
+    if missing_vars:
+        logger.error(f"❌ Missing required environment variables: {', '.join(missing_vars)}")
+        ok = False
+    if interval or cron_expr:
+        try:
+            logger.info(f"Schedule: {build_schedule(interval, cron_expr)}")
+        except ValueError as e:
+            logger.error(f"❌ Invalid schedule: {e}")
+            ok = False
+    if BATCH_USERS_FILE and not os.path.exists(BATCH_USERS_FILE):
+        logger.error(f"❌ BATCH_USERS_FILE {BATCH_USERS_FILE} does not exist")
+        ok = False
+    logger.info(
+        f"Config: app={APP_NAME}, user_id={USER_ID}, model={MODEL_NAME}, db={DB_NAME}, "
+        f"fanout={FANOUT}, stream_parse={STREAM_PARSE}, timeout={TIMEOUT}, retries={RETRIES}, "
+        f"spool={SPOOL_DIR or 'off'}, run_lock={f'ttl {RUN_LOCK_TTL:g}s' if RUN_LOCK else 'off'}, "
+        f"agent_concurrency={f'adaptive {AGENT_CONCURRENCY_MIN}-{AGENT_CONCURRENCY_MAX}' if ADAPTIVE_CONCURRENCY else 'off'}, "
+        f"circuit_breaker={f'{BREAKER_FAILURES} failures, reset {BREAKER_RESET:g}s' if CIRCUIT_BREAKER else 'off'}, "
+        f"response_cache={f'ttl {RESPONSE_CACHE_TTL:g}s' if RESPONSE_CACHE_TTL else 'off'}, "
+        f"coalesce={f'linger {COALESCE_LINGER:g}s' if COALESCE else 'off'}"
+    )
+    try:
+        logger.info(f"JSON backend: {json_backend.get_backend(JSON_BACKEND).name}")
+    except ValueError as e:
+        logger.error(f"❌ {e}")
+        ok = False
+    if ok:
+        logger.info("✅ Configuration OK")
+    return ok
+
+
+def dry_run(command: str | None, users_file: str | None = None, patterns: list[str] | None = None):
+    """Log the agent requests a run would send, without touching the network or MongoDB."""
+    if command == "backfill":
+        from services.backfill import expand_paths
+        paths = expand_paths(patterns or [])
+        for path in paths:
+            logger.info(f"[dry-run] would backfill {path}")
+        logger.info(f"[dry-run] {len(paths)} file(s) to backfill")
+        return
+    if command == "replay":
+        from services.spool import Spool
+        entries = Spool(SPOOL_DIR).entries() if SPOOL_DIR and os.path.isdir(SPOOL_DIR) else []
+        for entry in entries:
+            logger.info(f"[dry-run] would replay session_id={entry.session_id}, user_id={entry.user_id}")
+        logger.info(f"[dry-run] {len(entries)} spooled response(s) in {SPOOL_DIR or '(spool disabled)'}")
+        return
+    if command == "worker":
+        logger.info(f"[dry-run] a worker would run up to {WORKER_CONCURRENCY} queued job(s) at a time")
+        return
+    if command in ("batch", "enqueue") and not users_file:
+        logger.info(f"[dry-run] users would be read from the {BATCH_USERS_COLLECTION!r} collection")
+        return
+    if command == "enqueue":
+        from services.job_queue import job_key
+        users = load_users_file(users_file)
+        for target in users:
+            logger.info(f"[dry-run] would enqueue job {job_key(APP_NAME, target.user_id, target.preferences)}")
+        logger.info(f"[dry-run] {len(users)} job(s) to enqueue")
+        return
+    users = load_users_file(users_file) if command == "batch" else [UserTarget(user_id=USER_ID)]
+
+    session_id = new_session_id()
+    for target in users:
+        preferences = target.preferences or (PREFERENCES if FANOUT else [])
+        if FANOUT and not preferences:
+            logger.info(f"[dry-run] user_id={target.user_id}: preferences would be loaded from the news collection")
+            continue
+        queries = [f"{QUERY}: {p}" for p in preferences] or [QUERY]
+        for query in queries:
+            logger.info(f"[dry-run] POST {NEWS_API_URL} {build_request_body(session_id, target.user_id, query)}")
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="Fetch news from the agent and store it in MongoDB.")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="log the agent requests that would be sent and exit (run/batch)")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("run", help="one-shot run for USER_ID (default)")
+    batch = commands.add_parser("batch", help="run many users concurrently in one process")
+    batch.add_argument("--users-file", default=BATCH_USERS_FILE,
+                       help="JSON list or one user id per line; defaults to the BATCH_USERS_COLLECTION collection")
+    batch.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    daemon = commands.add_parser("daemon", help="stay resident and run on a schedule")
+    daemon.add_argument("--interval", type=float, default=SCHEDULE_INTERVAL, help="seconds between runs")
+    daemon.add_argument("--cron", default=SCHEDULE_CRON, help='cron expression in UTC, e.g. "*/15 * * * *"')
+    daemon.add_argument("--batch", action="store_true", help="run the batch user list on each tick")
+    daemon.add_argument("--users-file", default=BATCH_USERS_FILE)
+    daemon.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    replay = commands.add_parser("replay", help="ingest spooled agent responses without calling the agent")
+    replay.add_argument("session_ids", nargs="*", help="only these sessions (default: everything in SPOOL_DIR)")
+    backfill = commands.add_parser("backfill", help="ingest agent-response files (.json or .json.gz) offline")
+    backfill.add_argument("patterns", nargs="+", help="files, globs (quote them) or directories")
+    backfill.add_argument("--workers", type=int, help="parser processes (default: CPU count)")
+    backfill.add_argument("--checkpoint", default=BACKFILL_CHECKPOINT,
+                          help="file recording finished inputs, for resuming (empty string disables)")
+    backfill.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    enqueue = commands.add_parser("enqueue", help="register a recurring job per user in the jobs collection")
+    enqueue.add_argument("--users-file", default=BATCH_USERS_FILE,
+                         help="JSON list or one user id per line; defaults to the BATCH_USERS_COLLECTION collection")
+    enqueue.add_argument("--interval", type=float, default=JOB_INTERVAL, help="seconds between runs of each job")
+    worker = commands.add_parser("worker", help="claim and run queued jobs until stopped")
+    worker.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="jobs run at once by this worker")
+    commands.add_parser("check-config", help="validate the environment and exit")
+    args = parser.parse_args(argv)
+
+    if args.command == "check-config":
+        sys.exit(0 if check_config(SCHEDULE_INTERVAL, SCHEDULE_CRON) else 1)
+
+    # Replaying spooled responses and backfilling never call the agent
+    require_config(("MONGO_URI",) if args.command in ("replay", "backfill", "enqueue") else REQUIRED_VARS)
+    try:
+        json_backend.use_backend(JSON_BACKEND)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.dry_run:
+        dry_run(args.command, getattr(args, "users_file", None), getattr(args, "patterns", None))
+    elif args.command == "batch":
+        asyncio.run(run_batch(args.users_file, args.concurrency))
+    elif args.command == "daemon":
+        if not (args.interval or args.cron):
+            parser.error("daemon needs --interval or --cron (or SCHEDULE_INTERVAL / SCHEDULE_CRON)")
+        asyncio.run(run_daemon(args.interval, args.cron, args.batch, args.users_file, args.concurrency))
+    elif args.command == "enqueue":
+        asyncio.run(run_enqueue(args.users_file, args.interval))
+    elif args.command == "worker":
+        asyncio.run(run_worker(args.concurrency))
+    elif args.command == "replay":
+        asyncio.run(run_replay(args.session_ids))
+    elif args.command == "backfill":
+        asyncio.run(run_backfill(args.patterns, args.workers, args.checkpoint, args.restart))
+    else:
+        asyncio.run(run_job())
 
 
 if __name__ == "__main__":
-    asyncio.run(run_job())
\ No newline at end of file
+    main()
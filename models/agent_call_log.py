@@ -0,0 +1,40 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+class AgentCallLog(Document):
+    session_id: str
+    user_id: Optional[str] = None
+    parent_session_id: Optional[str] = None  # shared by the sub-calls of one fan-out run
+    preference: Optional[str] = None
+    replayed_from: Optional[str] = None  # session_id whose spooled response this run re-ingested
+    start_timestamp: datetime
+    end_timestamp: datetime
+    status: str
+    total_time_taken: float
+    request_size: int = 0  # encoded request body bytes
+    response_size: int  # decoded body bytes
+    response_wire_size: int = 0  # bytes received on the wire (before content decoding)
+    articles_total: Optional[int] = None  # articles parsed from the response
+    articles_inserted: Optional[int] = None
+    articles_duplicate: Optional[int] = None
+    articles_failed: Optional[int] = None
+    attempts: List[dict] = Field(default_factory=list)  # AttemptRecord per HTTP attempt
+    stage_timings: Dict[str, float] = Field(default_factory=dict)  # seconds per Timer span
+    breaker_transitions: List[str] = Field(default_factory=list)  # circuit breaker changes this call made, "open->half_open"
+    coalesced_with: Optional[dict] = None  # {session_id, user_id} of the agent call whose response this run shared
+    cache_hit: bool = False  # response served from the agent response cache, no agent call made
+    error_message: Optional[str] = None
+
+    class Settings:
+        name = "agent_call_log"
+        indexes = [
+            # Last runs by status
+            IndexModel(
+                [("status", ASCENDING), ("start_timestamp", DESCENDING)],
+                name="status_start_timestamp",
+            ),
+        ]
@@ -0,0 +1,27 @@
+from typing import List, Optional
+
+from pydantic import TypeAdapter
+from typing_extensions import Required, TypedDict
+
+# Shape of a response[].agent_response.news_fetched[] block, as far as
+# ingestion reads it. Unknown keys are ignored; a block is validated in one
+# TypeAdapter call instead of one News model per article, and its articles
+# one by one only when that fails, to skip just the malformed ones.
+
+
+class NewsItem(TypedDict, total=False):
+    heading: Required[str]
+    news: Required[str]
+    image: Optional[str]
+    src: List[str]
+
+
+class NewsFetched(TypedDict, total=False):
+    name: Required[str]
+    datetime: Required[float]  # unix timestamp
+    description: str
+    news: List[NewsItem]
+
+
+NEWS_FETCHED = TypeAdapter(NewsFetched)
+NEWS_ITEM = TypeAdapter(NewsItem)
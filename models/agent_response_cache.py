@@ -0,0 +1,27 @@
+from beanie import Document
+from pymongo import ASCENDING, IndexModel
+from datetime import datetime
+from typing import Optional
+
+
+class AgentResponseCache(Document):
+    id: str  # sha256 of the request (app, user, query, model, preference)
+    user_id: Optional[str] = None
+    query: Optional[str] = None
+    model_name: Optional[str] = None
+    preference: Optional[str] = None
+    body: bytes  # gzipped response body
+    size: int  # len(body), for the size limit
+    created_at: datetime
+    last_used_at: datetime  # LRU order
+    expires_at: datetime
+    hits: int = 0
+
+    class Settings:
+        name = "agent_response_cache"
+        indexes = [
+            # Lets MongoDB drop expired entries; get() ignores them before that
+            IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+            # Eviction order
+            IndexModel([("last_used_at", ASCENDING)], name="last_used_at"),
+        ]
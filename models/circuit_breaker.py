@@ -0,0 +1,16 @@
+from beanie import Document
+from datetime import datetime
+from typing import Optional
+
+
+class CircuitBreakerState(Document):
+    id: str  # the upstream, e.g. NEWS_API_URL
+    state: str = "closed"  # "closed", "open" or "half_open"
+    consecutive_failures: int = 0
+    opened_at: Optional[datetime] = None
+    probe_owner: Optional[str] = None  # "<host>:<pid>:<random>" of the call probing a half-open breaker
+    probe_expires_at: Optional[datetime] = None  # another call may probe after this
+    updated_at: Optional[datetime] = None
+
+    class Settings:
+        name = "circuit_breakers"
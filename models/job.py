@@ -0,0 +1,27 @@
+from beanie import Document
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+from datetime import datetime
+from typing import List, Optional
+
+
+class Job(Document):
+    key: str  # "<app_name>:<user_id>[:<preferences>]"
+    user_id: str
+    preferences: List[str] = Field(default_factory=list)
+    interval_seconds: float  # time between successful runs
+    next_run_at: datetime
+    lease_owner: Optional[str] = None  # worker currently running the job
+    lease_expires_at: Optional[datetime] = None
+    failures: int = 0  # consecutive failed runs, drives the retry backoff
+    runs: int = 0
+    last_run_at: Optional[datetime] = None
+    last_status: Optional[str] = None
+
+    class Settings:
+        name = "jobs"
+        indexes = [
+            IndexModel([("key", ASCENDING)], name="key_unique", unique=True),
+            # Claim order: the most overdue job first
+            IndexModel([("next_run_at", ASCENDING)], name="next_run_at"),
+        ]
@@ -1,7 +1,57 @@
+import hashlib
+from dataclasses import dataclass
 from beanie import Document
-from pydantic import Field
+from pydantic import Field, model_validator
+from pymongo import ASCENDING, DESCENDING, IndexModel
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Sequence
+
+
+def _normalize(text: Optional[str]) -> str:
+    return " ".join((text or "").split()).casefold()
+
+
+def make_dedup_key(heading: Optional[str], preference_name: Optional[str], src: Optional[Sequence[str]] = None) -> str:
+    """
+    Stable hash of the normalized heading, preference and first source URL.
+    The news datetime is left out on purpose: the agent stamps each response
+    with the time of the run, so the same article comes back with a new one.
+    """
+    normalized = "\x1f".join([
+        _normalize(heading),
+        _normalize(preference_name),
+        (src[0] or "").strip() if src else "",
+    ])
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+@dataclass(slots=True)
+class NewsRecord:
+    """
+    An already-validated article on its way to the bulk writer. Carries the
+    News fields without building a Beanie Document per article.
+    """
+    preference_name: str
+    heading: str
+    description: str
+    news_datetime: datetime
+    image: Optional[str]
+    src: List[str]
+    dedup_key: str
+
+    def to_document(self, inserted_at: datetime) -> dict:
+        # Same fields as a dumped News document, minus _id
+        return {
+            "preference_name": self.preference_name,
+            "heading": self.heading,
+            "description": self.description,
+            "news_datetime": self.news_datetime,
+            "image": self.image,
+            "src": self.src,
+            "inserted_at": inserted_at,
+            "dedup_key": self.dedup_key,
+        }
+
 
 class News(Document):
     preference_name: str
@@ -11,6 +61,28 @@ class News(Document):
     image: Optional[str] = None
     src: List[str] = Field(default_factory=list)
     inserted_at: datetime = Field(default_factory=datetime.utcnow)  # ✅ no ()
+    dedup_key: Optional[str] = None
+
+    @model_validator(mode="after")
+    def fill_dedup_key(self):
+        if self.dedup_key is None:
+            self.dedup_key = make_dedup_key(self.heading, self.preference_name, self.src)
+        return self
 
     class Settings:
         name = "news"
+        indexes = [
+            # Partial so legacy documents without a dedup_key don't collide on null
+            IndexModel(
+                [("dedup_key", ASCENDING)],
+                name="dedup_key_unique",
+                unique=True,
+                partialFilterExpression={"dedup_key": {"$type": "string"}},
+            ),
+            # Latest N articles for a preference
+            IndexModel(
+                [("preference_name", ASCENDING), ("news_datetime", DESCENDING)],
+                name="preference_name_news_datetime",
+            ),
+            IndexModel([("inserted_at", ASCENDING)], name="inserted_at"),
+        ]
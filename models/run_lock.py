@@ -0,0 +1,18 @@
+from beanie import Document
+from pymongo import ASCENDING, IndexModel
+from datetime import datetime
+
+
+class RunLock(Document):
+    id: str  # "<app_name>:<user_id>"
+    owner: str  # "<host>:<pid>:<random>" of the holder
+    acquired_at: datetime
+    renewed_at: datetime
+    expires_at: datetime
+
+    class Settings:
+        name = "run_locks"
+        indexes = [
+            # Lets MongoDB drop abandoned leases; an expired lease is free to take before that
+            IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+        ]
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import random
+import time
+from dataclasses import asdict, dataclass
+from typing import AsyncIterable, AsyncIterator, List, Optional
+
+import httpx
+
+from services import json_backend
+from services.limiter import DROP, IGNORE, OK, AdaptiveLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class AgentCallError(Exception):
+    """Raised when every attempt failed without an HTTP response to return."""
+
+
+class BodyTimeout(Exception):
+    """Raised when a streamed response body isn't received within its attempt's timeout."""
+
+
+@dataclass
+class RetryPolicy:
+    retries: int = 2  # extra attempts after the first one
+    backoff_base: float = 1.0
+    backoff_max: float = 30.0
+    attempt_timeout: Optional[float] = 300  # total seconds per attempt, None = unbounded
+
+    def backoff(self, attempt: int) -> float:
+        # Exponential backoff with full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+
+@dataclass
+class AttemptRecord:
+    attempt: int
+    latency: float
+    outcome: str  # "ok", "http_error", "http_5xx", "timeout" or "transport_error"
+    status_code: Optional[int] = None
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class TransferSizes:
+    """Bytes of one agent call, filled in as they become known so a failed call still reports them."""
+    request: int = 0  # encoded request body
+    response: int = 0  # decoded response body (read so far, when streaming)
+    wire: int = 0  # response body on the wire, before content decoding
+
+
+def is_retryable_status(status_code: int) -> bool:
+    return status_code >= 500
+
+
+def limiter_signal(record: AttemptRecord) -> str:
+    if record.outcome == "timeout" or record.status_code == 429 or is_retryable_status(record.status_code or 0):
+        return DROP
+    return OK if record.status_code is not None else IGNORE
+
+
+async def send_with_retries(
+    client: httpx.AsyncClient,
+    url: str,
+    json_body: dict,
+    policy: RetryPolicy,
+    attempts: List[AttemptRecord],
+    stream: bool = False,
+    deadline: Optional[float] = None,
+    trace=None,
+    limiter: Optional[AdaptiveLimiter] = None,
+    sizes: Optional[TransferSizes] = None,
+) -> httpx.Response:
+    """
+    POST `json_body` to `url`, retrying 5xx responses and transport errors.
+
+    Each attempt is appended to `attempts`. `deadline` is an absolute
+    time.monotonic() value; no attempt or backoff sleep runs past it. With
+    stream=True the returned response body is not read yet and the caller
+    must close it. When retries run out, the last 5xx response is returned
+    (so raise_for_status() reports it) or AgentCallError is raised.
+    Attempts already in `attempts` (e.g. a streamed body that timed out)
+    count against `policy.retries`.
+    `trace` is passed through as the httpcore trace extension. With a
+    `limiter`, each attempt waits for a slot until its response headers
+    arrive, and reports its outcome and latency back to it. `sizes.request`
+    is set to the encoded body's length.
+    """
+    last_response = None
+    last_error = None
+    content = json_backend.dumps(json_body)  # encoded once for every attempt
+    if sizes is not None:
+        sizes.request = len(content)
+
+    for attempt in range(len(attempts) + 1, policy.retries + 2):
+        timeout = policy.attempt_timeout
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        request = client.build_request(
+            "POST", url, content=content, headers={"Content-Type": "application/json"},
+            extensions={"trace": trace} if trace else None,
+        )
+        slot = await limiter.acquire() if limiter is not None else None
+        started = time.perf_counter()
+        record = AttemptRecord(attempt=attempt, latency=0.0, outcome="ok")
+        try:
+            resp = await asyncio.wait_for(client.send(request, stream=stream), timeout)
+            record.status_code = resp.status_code
+        except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+            record.outcome = "timeout"
+            record.error = str(e) or f"no response within {timeout:g}s"
+            last_error = record.error
+        except httpx.TransportError as e:
+            record.outcome = "transport_error"
+            record.error = f"{type(e).__name__}: {e}"
+            last_error = record.error
+        else:
+            if not is_retryable_status(resp.status_code):
+                record.outcome = "ok" if resp.is_success else "http_error"
+                record.latency = time.perf_counter() - started
+                attempts.append(record)
+                return resp
+
+            record.outcome = "http_5xx"
+            if stream:
+                # Keep the error body for the log, then release the connection
+                await resp.aread()
+                await resp.aclose()
+            last_response = resp
+        finally:
+            if slot is not None:
+                limiter.release(slot, time.perf_counter() - started, limiter_signal(record))
+        record.latency = time.perf_counter() - started
+        attempts.append(record)
+
+        if attempt > policy.retries:
+            break
+        delay = policy.backoff(attempt)
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            break
+        logger.warning(
+            f"⚠️ Agent attempt {attempt} failed ({record.outcome}"
+            f"{f' {record.status_code}' if record.status_code else ''}), retrying in {delay:.1f}s"
+        )
+        await asyncio.sleep(delay)
+
+    if last_response is not None:
+        return last_response
+    raise AgentCallError(f"Agent call failed after {len(attempts)} attempt(s): {last_error or 'run deadline exceeded'}")
+
+
+def body_timeout(policy: RetryPolicy, record: AttemptRecord) -> Optional[float]:
+    """What is left of the attempt's timeout for reading its body, once the headers took `record.latency`."""
+    if policy.attempt_timeout is None:
+        return None
+    return max(policy.attempt_timeout - record.latency, 0.0)
+
+
+async def read_within(chunks: AsyncIterable[bytes], timeout: Optional[float]) -> AsyncIterator[bytes]:
+    """
+    Pass a streamed body through, raising BodyTimeout once more than
+    `timeout` seconds were spent waiting for it. Only the waits count, not
+    the time the consumer spends on each chunk (e.g. blocked on Mongo).
+    """
+    if timeout is None:
+        async for chunk in chunks:
+            yield chunk
+        return
+
+    iterator = chunks.__aiter__()
+    remaining = timeout
+    while True:
+        started = time.monotonic()
+        try:
+            chunk = await asyncio.wait_for(iterator.__anext__(), remaining)
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            raise BodyTimeout(f"response body not received within {timeout:.3g}s") from None
+        remaining = max(remaining - (time.monotonic() - started), 0.0)
+        yield chunk
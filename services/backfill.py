@@ -0,0 +1,246 @@
+import asyncio
+import glob
+import gzip
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from models.news import NewsRecord
+from services import json_backend
+from services.news_service import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_QUEUE_DEPTH, DEFAULT_WRITERS, BulkInsertReport, ChunkResult, bulk_upsert_news,
+    iter_news_from_api_response,
+)
+from services.timing import Timer
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+def expand_paths(patterns: List[str]) -> List[Path]:
+    """Files matching `patterns` (paths, globs or directories of *.json / *.json.gz), deduplicated."""
+    paths: Dict[str, Path] = {}
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = sorted(glob.glob(os.path.join(pattern, "*.json")) + glob.glob(os.path.join(pattern, "*.json.gz")))
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True))
+        if not matches:
+            logger.warning(f"⚠️ No files match {pattern}")
+        for match in matches:
+            if os.path.isfile(match):
+                paths.setdefault(os.path.realpath(match), Path(match))
+    return list(paths.values())
+
+
+def parse_file(path: str) -> Tuple[List[NewsRecord], List[Tuple[Optional[str], int, Exception]]]:
+    """
+    Read one (optionally gzipped) agent response and build its records. Runs in
+    a worker process, so the invalid articles are returned to be counted by the
+    parent: ([records], [(preference_name, articles, error)]).
+    """
+    data = Path(path).read_bytes()
+    if data[:2] == GZIP_MAGIC:
+        data = gzip.decompress(data)
+    invalid = []
+    records = list(iter_news_from_api_response(
+        json_backend.loads(data) or {},
+        on_invalid=lambda preference_name, articles, error: invalid.append((preference_name, articles, error)),
+    ))
+    return records, invalid
+
+
+class Checkpoint:
+    """
+    Files already fully ingested, one JSON line per file appended as it
+    finishes, so recording a file costs the same however many came before.
+    A file is recorded with its size and mtime, so a file that changed runs
+    again. A torn last line (the run was killed mid-write) is ignored, and
+    the older single-object format ({"files": {...}}) is still read.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.files: Dict[str, list] = {}
+        self._torn = False  # the last line has no newline: start on a fresh one
+        if self.path.exists():
+            with self.path.open(encoding="utf-8") as f:
+                for line in f:
+                    self._torn = not line.endswith("\n")
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if "files" in entry:
+                        self.files.update(entry["files"])
+                    elif "path" in entry:
+                        self.files[entry["path"]] = entry["stamp"]
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return os.path.realpath(path)
+
+    @staticmethod
+    def _stamp(path: Path) -> list:
+        stat = path.stat()
+        return [stat.st_size, stat.st_mtime]
+
+    def is_done(self, path: Path) -> bool:
+        return self.files.get(self._key(path)) == self._stamp(path)
+
+    def mark_done(self, path: Path):
+        key, stamp = self._key(path), self._stamp(path)
+        self.files[key] = stamp
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(("\n" if self._torn else "") + json.dumps({"path": key, "stamp": stamp}) + "\n")
+        self._torn = False
+
+
+@dataclass
+class BackfillProgress:
+    files_total: int
+    files_done: int = 0
+    files_failed: int = 0
+    files_skipped: int = 0  # already in the checkpoint
+    articles: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def articles_per_sec(self) -> float:
+        return self.articles / self.elapsed if self.elapsed else 0.0
+
+    def summary(self) -> str:
+        finished = self.files_done + self.files_failed + self.files_skipped
+        return (
+            f"{finished}/{self.files_total} files ({self.files_failed} failed, {self.files_skipped} skipped), "
+            f"{self.articles} articles ({self.inserted} new, {self.duplicates} duplicates, {self.failed} failed), "
+            f"{self.articles_per_sec:.0f} articles/s"
+        )
+
+
+async def backfill(
+    paths: List[Path],
+    checkpoint: Optional[Checkpoint] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    writers: int = DEFAULT_WRITERS,
+    queue_depth: int = DEFAULT_QUEUE_DEPTH,
+    progress_every: float = 5.0,
+    timer: Optional[Timer] = None,
+) -> BackfillProgress:
+    """
+    Ingest agent-response files without calling the agent.
+
+    Files are parsed in a pool of `workers` processes (at most two files per
+    worker in flight) and every record goes through one bulk_upsert_news
+    pipeline, so chunks span files. A file is added to `checkpoint` once all
+    of its records were written without failures; files already there are
+    skipped.
+    """
+    workers = workers or os.cpu_count() or 1
+    progress = BackfillProgress(files_total=len(paths))
+    todo = [path for path in paths if checkpoint is None or not checkpoint.is_done(path)]
+    progress.files_skipped = len(paths) - len(todo)
+    if progress.files_skipped:
+        logger.info(f"Skipping {progress.files_skipped} file(s) already in the checkpoint")
+
+    owners: Dict[int, int] = {}  # id(record) -> index in todo, until the record is written
+    outstanding: Dict[int, int] = {}  # index in todo -> records not written yet
+    dirty: Set[int] = set()  # files with failed writes
+    report = BulkInsertReport()
+    last_report = time.perf_counter()
+
+    def settle(index: int):
+        if index in dirty:
+            progress.files_failed += 1
+            return
+        progress.files_done += 1
+        if checkpoint is not None:
+            checkpoint.mark_done(todo[index])
+
+    def on_chunk(result: ChunkResult, chunk: List[NewsRecord]):
+        nonlocal last_report
+        progress.articles += result.size
+        progress.inserted += result.inserted
+        progress.duplicates += result.duplicates
+        progress.failed += result.failed
+        for index, count in Counter(owners.pop(id(record)) for record in chunk).items():
+            if result.failed:
+                dirty.add(index)
+            outstanding[index] -= count
+            if not outstanding[index]:
+                del outstanding[index]
+                settle(index)
+        if time.perf_counter() - last_report >= progress_every:
+            last_report = time.perf_counter()
+            logger.info(f"📦 Backfill: {progress.summary()}")
+
+    async def records():
+        loop = asyncio.get_running_loop()
+        # Spawned, not forked: this process already runs threads (motor, asyncio.to_thread)
+        # whose locks a forked child could inherit held. The JSON backend is set up again in each.
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=json_backend.use_backend,
+            initargs=(json_backend.backend_name(),),
+        )
+        window = 2 * workers
+        submitted = 0
+        pending: Dict[asyncio.Future, int] = {}
+
+        def submit():
+            nonlocal submitted
+            while submitted < len(todo) and len(pending) < window:
+                future = loop.run_in_executor(pool, parse_file, str(todo[submitted]))
+                pending[future] = submitted
+                submitted += 1
+
+        try:
+            submit()
+            while pending:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    index = pending.pop(future)
+                    submit()  # keep the workers busy while this file's records are written
+                    try:
+                        file_records, invalid = future.result()
+                    except Exception as e:
+                        logger.error(f"❌ Could not parse {todo[index]}: {e}")
+                        progress.files_failed += 1
+                        continue
+                    # Invalid articles would be skipped again, so they don't keep the file out of the checkpoint
+                    for preference_name, articles, error in invalid:
+                        report.skip_invalid(preference_name, articles, error)
+                        progress.articles += articles
+                        progress.failed += articles
+                    if not file_records:
+                        settle(index)
+                        continue
+                    outstanding[index] = len(file_records)
+                    for record in file_records:
+                        owners[id(record)] = index
+                        yield record
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    await bulk_upsert_news(
+        records(), chunk_size=chunk_size, timer=timer, writers=writers, queue_depth=queue_depth, on_chunk=on_chunk,
+        report=report,
+    )
+    return progress
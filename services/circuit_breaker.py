@@ -0,0 +1,153 @@
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from services.leases import new_owner_id
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised when the breaker is open (or half-open with a probe already in flight)."""
+
+
+@dataclass
+class Permit:
+    probe: bool = False  # this call decides whether a half-open breaker closes
+    transitions: List[str] = field(default_factory=list)  # "<from>-><to>" caused by this call
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one upstream, with its state in a MongoDB collection
+    ({_id, state, consecutive_failures, opened_at, probe_owner,
+    probe_expires_at}) so every process and host sees the same state.
+
+    `failure_threshold` consecutive failures open it; a call slower than
+    `latency_threshold` counts as a failure. While open, allow() raises
+    CircuitOpenError without touching the upstream. After `reset_timeout` the
+    next call becomes the single half-open probe: its success closes the
+    breaker, its failure opens it again. A probe that never reports back is
+    replaced after `probe_timeout`.
+
+    Each state change is made with a conditional update, so when several
+    processes race only one of them performs (and reports) it.
+    """
+
+    def __init__(
+        self,
+        collection,
+        name: str,
+        failure_threshold: int = 5,
+        latency_threshold: Optional[float] = None,
+        reset_timeout: float = 60,
+        probe_timeout: float = 300,
+        owner: Optional[str] = None,
+    ):
+        self.collection = collection
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.latency_threshold = latency_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self.owner = owner or new_owner_id()
+
+    async def _load(self) -> dict:
+        state = await self.collection.find_one({"_id": self.name})
+        if state is None:
+            try:
+                state = {"_id": self.name, "state": CLOSED, "consecutive_failures": 0, "updated_at": datetime.utcnow()}
+                await self.collection.insert_one(state)
+            except DuplicateKeyError:
+                state = await self.collection.find_one({"_id": self.name})
+        return state
+
+    async def _transition(self, condition: dict, to: str, update: dict, permit: Permit, report: bool = True) -> bool:
+        now = datetime.utcnow()
+        previous = await self.collection.find_one_and_update(
+            {"_id": self.name, **condition},
+            {"$set": {"state": to, "updated_at": now, **update}},
+            return_document=ReturnDocument.BEFORE,
+        )
+        if previous is None:
+            return False  # another process got there first
+        if not report:
+            return True
+        transition = f"{previous['state']}->{to}"
+        permit.transitions.append(transition)
+        log = logger.info if to == CLOSED else logger.warning
+        log(f"{'✅' if to == CLOSED else '🔌'} Circuit breaker {self.name}: {transition}")
+        return True
+
+    async def allow(self) -> Permit:
+        """Permission for one call; raises CircuitOpenError when the call should fail fast."""
+        state = await self._load()
+        permit = Permit()
+        if state["state"] == CLOSED:
+            return permit
+
+        now = datetime.utcnow()
+        probe = {"probe_owner": self.owner, "probe_expires_at": now + timedelta(seconds=self.probe_timeout)}
+        if state["state"] == OPEN:
+            retry_at = state["opened_at"] + timedelta(seconds=self.reset_timeout)
+            if now >= retry_at and await self._transition(
+                {"state": OPEN, "opened_at": state["opened_at"]}, HALF_OPEN, probe, permit
+            ):
+                permit.probe = True
+                return permit
+            raise CircuitOpenError(f"Circuit breaker for {self.name} is open until {retry_at:%H:%M:%S} UTC")
+
+        # Half-open: only the probe goes through, unless it was abandoned
+        if state.get("probe_expires_at") and now >= state["probe_expires_at"] and await self._transition(
+            {"state": HALF_OPEN, "probe_owner": state.get("probe_owner")}, HALF_OPEN, probe, permit, report=False
+        ):
+            logger.warning(f"🔌 Circuit breaker {self.name}: probe {state.get('probe_owner')} timed out, probing again")
+            permit.probe = True
+            return permit
+        raise CircuitOpenError(f"Circuit breaker for {self.name} is half-open and a probe is in flight")
+
+    def is_failure(self, ok: bool, latency: Optional[float]) -> bool:
+        return not ok or (
+            self.latency_threshold is not None and latency is not None and latency > self.latency_threshold
+        )
+
+    async def record(self, permit: Permit, ok: bool, latency: Optional[float] = None):
+        """Report the outcome of a permitted call; `transitions` on `permit` lists what it changed."""
+        now = datetime.utcnow()
+        if not self.is_failure(ok, latency):
+            if permit.probe:
+                await self._transition(
+                    {"state": HALF_OPEN, "probe_owner": self.owner}, CLOSED,
+                    {"consecutive_failures": 0, "opened_at": None, "probe_owner": None, "probe_expires_at": None},
+                    permit,
+                )
+            else:
+                # Only writes when there is a failure streak to reset
+                await self.collection.update_one(
+                    {"_id": self.name, "consecutive_failures": {"$gt": 0}},
+                    {"$set": {"consecutive_failures": 0, "updated_at": now}},
+                )
+            return
+
+        if permit.probe:
+            await self._transition(
+                {"state": HALF_OPEN, "probe_owner": self.owner}, OPEN,
+                {"opened_at": now, "probe_owner": None, "probe_expires_at": None},
+                permit,
+            )
+            return
+        state = await self.collection.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"consecutive_failures": 1}, "$set": {"updated_at": now}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if state is not None and state["state"] == CLOSED and state["consecutive_failures"] >= self.failure_threshold:
+            await self._transition({"state": CLOSED}, OPEN, {"opened_at": now}, permit)
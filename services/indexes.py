@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from typing import Dict, List, Sequence, Type
+
+from beanie import Document
+from beanie.odm.fields import IndexModelField
+from pymongo import IndexModel
+
+logger = logging.getLogger(__name__)
+
+
+def is_required(index: IndexModel) -> bool:
+    """Unique and TTL indexes: correctness depends on them, not just query speed."""
+    return bool(index.document.get("unique")) or "expireAfterSeconds" in index.document
+
+
+async def _ensure_model_indexes(model: Type[Document], required_only: bool) -> Dict[str, List[str]]:
+    collection = model.get_motor_collection()
+    # init_beanie normalizes Settings.indexes into IndexModelField wrappers
+    declared = [
+        field.index for field in model.get_settings().indexes or []
+        if isinstance(field, IndexModelField) and (is_required(field.index) or not required_only)
+    ]
+    if not declared:
+        return {"created": [], "existing": [], "failed": []}
+    existing_names = set(await collection.index_information())
+
+    missing = [idx for idx in declared if idx.document["name"] not in existing_names]
+    existing = [idx.document["name"] for idx in declared if idx.document["name"] in existing_names]
+    created, failed = [], []
+    for idx in missing:
+        # One at a time, so an index that can't be built (e.g. unique over duplicates) doesn't hide the others
+        try:
+            created += await collection.create_indexes([idx])
+        except Exception as e:
+            failed.append(idx.document["name"])
+            logger.error(f"❌ Could not create index {collection.name}.{idx.document['name']}: {e}")
+
+    # Reported when indexes were asked for (ENSURE_INDEXES); the every-run required check stays quiet
+    log_existing = logger.debug if required_only else logger.info
+    for name in existing:
+        log_existing(f"✅ Index {collection.name}.{name} already exists")
+    for name in created:
+        logger.info(f"🆕 Created index {collection.name}.{name}")
+    return {"created": list(created), "existing": existing, "failed": failed}
+
+
+async def ensure_indexes(
+    document_models: Sequence[Type[Document]], required_only: bool = False
+) -> Dict[str, Dict[str, List[str]]]:
+    """
+    Create the IndexModels declared in each model's Settings.indexes that are
+    missing from its collection (only the unique and TTL ones with
+    `required_only`). Indexes are matched by name; existing ones are left
+    untouched, and logged at INFO unless `required_only`. An index that can't
+    be created is logged and reported, not raised.
+
+    Returns {collection_name: {"created": [...], "existing": [...], "failed": [...]}}.
+    """
+    results = await asyncio.gather(*(_ensure_model_indexes(model, required_only) for model in document_models))
+    return {model.get_motor_collection().name: result for model, result in zip(document_models, results)}
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional, Set
+
+from pymongo import ASCENDING, ReturnDocument
+
+from services import metrics
+from services.leases import new_owner_id
+
+logger = logging.getLogger(__name__)
+
+
+def job_key(app_name: str, user_id: str, preferences: List[str]) -> str:
+    key = f"{app_name}:{user_id}"
+    return f"{key}:{','.join(sorted(preferences))}" if preferences else key
+
+
+async def enqueue(collection, key: str, user_id: str, preferences: List[str], interval_seconds: float) -> bool:
+    """
+    Register a recurring job, due now. An existing job keeps its schedule and
+    lease; only its interval is updated. Returns True if the job is new.
+    """
+    result = await collection.update_one(
+        {"key": key},
+        {
+            "$set": {"interval_seconds": interval_seconds},
+            "$setOnInsert": {
+                "user_id": user_id,
+                "preferences": preferences,
+                "next_run_at": datetime.utcnow(),
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "failures": 0,
+                "runs": 0,
+            },
+        },
+        upsert=True,
+    )
+    return result.upserted_id is not None
+
+
+class JobWorker:
+    """
+    Claims due jobs from the `jobs` collection and runs them, up to
+    `concurrency` at a time. Any number of workers on any number of hosts can
+    share the collection.
+
+    A claim is one atomic find_one_and_update on the most overdue job whose
+    lease is free or expired, so a job runs on one worker at a time and the
+    jobs of a crashed worker are picked up again once its leases expire.
+    Running jobs renew their lease every lease_seconds/3; a run whose lease
+    was taken over (e.g. this worker stalled past it) is cancelled, so a job
+    never keeps running on two workers. When a run ends,
+    the job is rescheduled `interval_seconds` later, or sooner with
+    exponential backoff (capped at the interval) if it failed.
+    """
+
+    def __init__(
+        self,
+        collection,
+        handler: Callable[[dict], Awaitable[str]],
+        concurrency: int = 4,
+        lease_seconds: float = 300,
+        poll_interval: float = 5,
+        retry_base: float = 30,
+        owner: Optional[str] = None,
+    ):
+        self.collection = collection
+        self.handler = handler  # runs a job document, returns its status ("pass" = success)
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.retry_base = retry_base
+        self.owner = owner or new_owner_id()
+        self._stop = asyncio.Event()
+
+    def stop(self):
+        self._stop.set()
+
+    async def claim(self) -> Optional[dict]:
+        now = datetime.utcnow()
+        job = await self.collection.find_one_and_update(
+            {
+                "next_run_at": {"$lte": now},
+                "$or": [{"lease_expires_at": None}, {"lease_expires_at": {"$lte": now}}],
+            },
+            {"$set": {"lease_owner": self.owner, "lease_expires_at": now + timedelta(seconds=self.lease_seconds)}},
+            sort=[("next_run_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is not None:
+            metrics.JOB_LAG.observe(max(0.0, (now - job["next_run_at"]).total_seconds()))
+        return job
+
+    async def _renew(self, job: dict, on_lost: Callable[[], None]):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                result = await self.collection.update_one(
+                    {"_id": job["_id"], "lease_owner": self.owner},
+                    {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}},
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Could not renew the lease on job {job['key']}: {e}")
+                continue
+            if not result.matched_count:
+                logger.error(f"❌ Lease on job {job['key']} was lost to another worker")
+                on_lost()
+                return
+
+    def _next_run(self, job: dict, status: str, now: datetime) -> tuple:
+        if status in ("pass", "skipped"):
+            return now + timedelta(seconds=job["interval_seconds"]), 0
+        failures = job.get("failures", 0) + 1
+        delay = min(job["interval_seconds"], self.retry_base * 2 ** (failures - 1))
+        return now + timedelta(seconds=delay), failures
+
+    async def _execute(self, job: dict):
+        run = asyncio.create_task(self.handler(job))
+        lost = []
+
+        def on_lost():
+            lost.append(True)
+            run.cancel(f"lease on job {job['key']} was lost")
+
+        heartbeat = asyncio.create_task(self._renew(job, on_lost))
+        status = "fail"
+        try:
+            status = await run
+        except asyncio.CancelledError:
+            if lost and not asyncio.current_task().cancelling():
+                # The worker that holds the lease now runs and reschedules the job
+                metrics.JOBS.inc(status="lost")
+                logger.error(f"❌ Job {job['key']} cancelled: its lease was lost")
+                return
+            # Shutting down: hand the job back so another worker can run it right away
+            await self.collection.update_one(
+                {"_id": job["_id"], "lease_owner": self.owner},
+                {"$set": {"lease_owner": None, "lease_expires_at": None}},
+            )
+            raise
+        except Exception as e:
+            logger.exception(f"❌ Job {job['key']} failed: {e}")
+        finally:
+            heartbeat.cancel()
+
+        now = datetime.utcnow()
+        next_run_at, failures = self._next_run(job, status, now)
+        try:
+            await self._finish(job, status, now, next_run_at, failures)
+        except Exception as e:
+            # The lease expires on its own and the job runs again then
+            logger.error(f"❌ Could not reschedule job {job['key']}: {e}")
+            return
+        metrics.JOBS.inc(status=status)
+        logger.info(f"Job {job['key']} finished with {status}, next run at {next_run_at:%Y-%m-%d %H:%M:%S} UTC")
+
+    async def _finish(self, job: dict, status: str, now: datetime, next_run_at: datetime, failures: int):
+        await self.collection.update_one(
+            {"_id": job["_id"], "lease_owner": self.owner},
+            {
+                "$set": {
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "next_run_at": next_run_at,
+                    "failures": failures,
+                    "last_run_at": now,
+                    "last_status": status,
+                },
+                "$inc": {"runs": 1},
+            },
+        )
+
+    async def run(self, grace_seconds: float = 300):
+        """Claim and run jobs until stop(); then let running jobs finish for up to `grace_seconds`."""
+        logger.info(f"👷 Worker {self.owner} started, concurrency={self.concurrency}")
+        running: Set[asyncio.Task] = set()
+        stopping = asyncio.create_task(self._stop.wait())
+
+        while not self._stop.is_set():
+            while len(running) < self.concurrency:
+                try:
+                    job = await self.claim()
+                except Exception as e:
+                    logger.warning(f"⚠️ Could not claim a job: {e}")
+                    break
+                if job is None:
+                    break
+                running.add(asyncio.create_task(self._execute(job)))
+
+            # Wake up when a slot frees, on stop, or (with a free slot) after the jittered poll interval
+            timeout = self.poll_interval * random.uniform(0.5, 1.5) if len(running) < self.concurrency else None
+            await asyncio.wait(running | {stopping}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            running = {task for task in running if not task.done()}
+
+        if running:
+            logger.info(f"Waiting up to {grace_seconds:g}s for {len(running)} running job(s)")
+            _, not_done = await asyncio.wait(running, timeout=grace_seconds)
+            for task in not_done:
+                task.cancel()
+            await asyncio.gather(*not_done, return_exceptions=True)
+        logger.info(f"👷 Worker {self.owner} stopped")
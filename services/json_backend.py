@@ -0,0 +1,72 @@
+import json
+import logging
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Tried in this order when the backend is "auto"
+BACKENDS = ("orjson", "msgspec", "json")
+
+
+@dataclass(frozen=True)
+class JsonBackend:
+    name: str
+    loads: Callable[[Union[bytes, str]], Any]
+    dumps: Callable[[Any], bytes]  # compact UTF-8 JSON
+
+
+def _load(name: str) -> Optional[JsonBackend]:
+    if name == "orjson":
+        try:
+            import orjson
+        except ImportError:
+            return None
+        return JsonBackend("orjson", orjson.loads, orjson.dumps)
+    if name == "msgspec":
+        try:
+            import msgspec
+        except ImportError:
+            return None
+        return JsonBackend("msgspec", msgspec.json.decode, msgspec.json.encode)
+    if name == "json":
+        return JsonBackend(
+            "json", json.loads, lambda obj: json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        )
+    raise ValueError(f"Unknown JSON backend {name!r}, expected one of: auto, {', '.join(BACKENDS)}")
+
+
+def get_backend(name: str = "auto") -> JsonBackend:
+    """
+    Resolve a backend by name. "auto" picks the fastest one installed; a named
+    backend that is not installed falls back to the stdlib with a warning.
+    """
+    if name == "auto":
+        return next(backend for backend in map(_load, BACKENDS) if backend is not None)
+    backend = _load(name)
+    if backend is None:
+        logger.warning(f"JSON backend {name} is not installed; using the stdlib json module.")
+        return _load("json")
+    return backend
+
+
+_backend = get_backend()
+
+
+def use_backend(name: str) -> JsonBackend:
+    """Switch the process-wide backend used by loads()/dumps()."""
+    global _backend
+    _backend = get_backend(name)
+    return _backend
+
+
+def backend_name() -> str:
+    return _backend.name
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    return _backend.loads(data)
+
+
+def dumps(obj: Any) -> bytes:
+    return _backend.dumps(obj)
@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+
+def new_owner_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Lease:
+    """
+    A named lease in a MongoDB collection ({_id, owner, acquired_at,
+    renewed_at, expires_at}), shared by every process and host using it.
+
+    acquire() takes the lease if it is free or expired; while held, a
+    background heartbeat pushes expires_at forward every ttl/3 seconds, so a
+    crashed holder frees it within `ttl`. If a renewal finds the lease taken
+    over, `lost` is set, `on_lost()` is called (e.g. to cancel the work the
+    lease protects) and the heartbeat stops.
+    """
+
+    def __init__(
+        self,
+        collection,
+        key: str,
+        ttl: float = 60,
+        owner: Optional[str] = None,
+        on_lost: Optional[Callable[[], None]] = None,
+    ):
+        self.collection = collection
+        self.key = key
+        self.ttl = ttl
+        self.owner = owner or new_owner_id()
+        self.on_lost = on_lost
+        self.holder: Optional[str] = None  # current owner when acquire() failed
+        self.lost = False
+        self._heartbeat: Optional[asyncio.Task] = None
+
+    async def _try_acquire(self) -> bool:
+        now = datetime.utcnow()
+        try:
+            await self.collection.find_one_and_update(
+                {"_id": self.key, "$or": [{"expires_at": {"$lte": now}}, {"owner": self.owner}]},
+                {"$set": {
+                    "owner": self.owner,
+                    "acquired_at": now,
+                    "renewed_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl),
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return True
+        except DuplicateKeyError:
+            # Held and not expired: the upsert tried to insert a second document with this _id
+            current = await self.collection.find_one({"_id": self.key}, {"owner": 1})
+            self.holder = current.get("owner") if current else None
+            return False
+
+    async def acquire(self, wait: float = 0, poll_interval: float = 1.0) -> bool:
+        """Take the lease, retrying for up to `wait` seconds. Returns False if another owner holds it."""
+        loop = asyncio.get_running_loop()
+        give_up_at = loop.time() + wait
+        while not await self._try_acquire():
+            remaining = give_up_at - loop.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(poll_interval, remaining))
+
+        self.lost = False
+        self._heartbeat = asyncio.create_task(self._renew_forever())
+        return True
+
+    async def _renew_forever(self):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            now = datetime.utcnow()
+            try:
+                result = await self.collection.update_one(
+                    {"_id": self.key, "owner": self.owner},
+                    {"$set": {"renewed_at": now, "expires_at": now + timedelta(seconds=self.ttl)}},
+                )
+            except Exception as e:
+                # Keep trying; the lease only lapses after a full ttl without renewals
+                logger.warning(f"⚠️ Could not renew lease {self.key}: {e}")
+                continue
+            if not result.matched_count:
+                self.lost = True
+                logger.error(f"❌ Lease {self.key} was lost to another owner")
+                if self.on_lost is not None:
+                    self.on_lost()
+                return
+
+    async def release(self):
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+            self._heartbeat = None
+        await self.collection.delete_one({"_id": self.key, "owner": self.owner})
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Optional
+
+from services import metrics
+
+logger = logging.getLogger(__name__)
+
+# Release signals
+OK = "ok"  # a response arrived; its latency is a sample
+DROP = "drop"  # the backend is overloaded: timeout, 429 or 5xx
+IGNORE = "ignore"  # says nothing about load (transport error, cancelled)
+
+
+@dataclass
+class LimiterSlot:
+    started: float  # time.monotonic() when the slot was granted
+    inflight: int  # calls in flight once this one started
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limit for the calls to one backend, shared by every
+    caller in the process.
+
+    Each successful response grows the limit by 1/limit (one slot per
+    `limit` successes) as long as the limit is actually used and latency
+    stays within `tolerance` times the long-run baseline. A latency above
+    that shrinks it by `latency_ratio`; a timeout, 429 or 5xx by
+    `backoff_ratio`. Only calls started after the last decrease can
+    decrease it again, so one burst of failures counts once. The limit
+    starts at `initial`, by default `max_limit`.
+    """
+
+    def __init__(
+        self,
+        initial: Optional[int] = None,
+        min_limit: int = 1,
+        max_limit: int = 100,
+        tolerance: float = 2.0,
+        backoff_ratio: float = 0.5,
+        latency_ratio: float = 0.9,
+        smoothing: float = 0.05,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        initial = self.max_limit if initial is None else initial
+        self.limit = float(min(max(initial, self.min_limit), self.max_limit))
+        self.tolerance = tolerance
+        self.backoff_ratio = backoff_ratio
+        self.latency_ratio = latency_ratio
+        self.smoothing = smoothing
+        self.inflight = 0
+        self.latency: Optional[float] = None  # short-run EWMA of response latency
+        self.baseline: Optional[float] = None  # long-run EWMA, the "unloaded" latency
+        self._last_decrease = float("-inf")
+        self._waiters: Deque[asyncio.Future] = deque()
+        metrics.AGENT_CONCURRENCY_LIMIT.set(self.limit)
+
+    def _grant(self) -> LimiterSlot:
+        self.inflight += 1
+        metrics.AGENT_INFLIGHT.set(self.inflight)
+        return LimiterSlot(started=time.monotonic(), inflight=self.inflight)
+
+    async def acquire(self) -> LimiterSlot:
+        if self.inflight < int(self.limit) and not self._waiters:
+            return self._grant()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as we were cancelled: hand the slot on
+                self._free()
+            else:
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self, slot: LimiterSlot, latency: float, signal: str):
+        """Give back `slot`; `latency` and `signal` (OK, DROP or IGNORE) adjust the limit."""
+        if signal == OK:
+            self._on_sample(slot, latency)
+        elif signal == DROP:
+            self._decrease(slot, self.backoff_ratio, "overloaded")
+        self._free()
+
+    def _free(self):
+        self.inflight -= 1
+        while self._waiters and self.inflight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(self._grant())
+        metrics.AGENT_INFLIGHT.set(self.inflight)
+
+    def _on_sample(self, slot: LimiterSlot, latency: float):
+        if self.baseline is None:
+            self.baseline = self.latency = latency
+        else:
+            self.latency += 0.3 * (latency - self.latency)
+            self.baseline += self.smoothing * (latency - self.baseline)
+        metrics.AGENT_LATENCY_EWMA.set(self.latency)
+        metrics.AGENT_LATENCY_BASELINE.set(self.baseline)
+
+        if self.latency > self.tolerance * self.baseline:
+            self._decrease(slot, self.latency_ratio, f"latency {self.latency:.2f}s vs {self.baseline:.2f}s baseline")
+        elif slot.inflight * 2 >= self.limit:
+            # Only grow a limit that is being used
+            self._set_limit(self.limit + 1 / self.limit)
+
+    def _decrease(self, slot: LimiterSlot, ratio: float, reason: str):
+        if slot.started < self._last_decrease:
+            return
+        self._last_decrease = time.monotonic()
+        previous = self.limit
+        self._set_limit(self.limit * ratio)
+        if int(self.limit) < int(previous):
+            logger.warning(f"⚠️ Agent concurrency limit {int(previous)} -> {int(self.limit)} ({reason})")
+
+    def _set_limit(self, limit: float):
+        self.limit = min(max(limit, self.min_limit), self.max_limit)
+        metrics.AGENT_CONCURRENCY_LIMIT.set(self.limit)
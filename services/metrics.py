@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import math
+import os
+import tempfile
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(header + self._samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = float(value)
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.setdefault(key, {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state["counts"][i] += 1
+        state["sum"] += value
+        state["count"] += 1
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, state in self._values.items():
+            for bound, count in zip(self.buckets, state["counts"]):
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            lines.append(f"{self.name}_count{labels} {state['count']}")
+        return lines
+
+
+class Registry:
+    """
+    Prometheus text exposition of registered metrics, served over HTTP in
+    daemon mode or written to a textfile-collector file in one-shot mode.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+RUNS = REGISTRY.register(Counter(
+    "news_cron_runs_total", "Agent calls finished, by status.", ["status"]))
+RUN_DURATION = REGISTRY.register(Histogram(
+    "news_cron_run_duration_seconds", "Wall time of one agent call including ingestion.", ["status"]))
+LAST_RUN = REGISTRY.register(Gauge(
+    "news_cron_last_run_timestamp_seconds", "Unix time the last agent call finished, by status.", ["status"]))
+AGENT_LATENCY = REGISTRY.register(Histogram(
+    "news_cron_agent_latency_seconds", "Latency of each agent HTTP attempt, by outcome.", ["outcome"]))
+AGENT_CONCURRENCY_LIMIT = REGISTRY.register(Gauge(
+    "news_cron_agent_concurrency_limit", "Current adaptive limit on concurrent agent calls."))
+AGENT_INFLIGHT = REGISTRY.register(Gauge(
+    "news_cron_agent_inflight", "Agent calls currently in flight."))
+AGENT_LATENCY_EWMA = REGISTRY.register(Gauge(
+    "news_cron_agent_latency_ewma_seconds", "Smoothed latency of recent agent responses."))
+AGENT_LATENCY_BASELINE = REGISTRY.register(Gauge(
+    "news_cron_agent_latency_baseline_seconds", "Long-run agent latency the concurrency limiter compares against."))
+RESPONSE_CACHE = REGISTRY.register(Counter(
+    "news_cron_response_cache_total", "Agent response cache lookups and stores, by result (hit, miss, store).",
+    ["result"]))
+COALESCED_CALLS = REGISTRY.register(Counter(
+    "news_cron_coalesced_calls_total", "Agent calls served by joining an identical call in flight."))
+ARTICLES = REGISTRY.register(Counter(
+    "news_cron_articles_total", "Articles processed by ingestion, by preference and result.",
+    ["preference", "result"]))
+BULK_WRITE_DURATION = REGISTRY.register(Histogram(
+    "news_cron_bulk_write_seconds", "Latency of each news bulk_write chunk."))
+BULK_WRITE_FAILURES = REGISTRY.register(Counter(
+    "news_cron_bulk_write_failures_total", "Articles that failed to write, by error kind.", ["kind"]))
+INGEST_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "news_cron_ingest_queue_wait_seconds", "Time a built chunk waited in the ingestion queue for a writer."))
+INGEST_QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "news_cron_ingest_queue_depth", "Chunks waiting in the ingestion queue."))
+JOBS = REGISTRY.register(Counter(
+    "news_cron_jobs_total", "Queued jobs run by this worker, by status.", ["status"]))
+JOB_LAG = REGISTRY.register(Histogram(
+    "news_cron_job_lag_seconds", "How overdue a job was when a worker claimed it."))
+
+
+def write_textfile(path: str, registry: Registry = REGISTRY):
+    """Atomically write the exposition to `path` for node_exporter's textfile collector."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics-", suffix=".prom.tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(registry.render())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+async def start_http_server(port: int, host: str = "0.0.0.0", registry: Registry = REGISTRY) -> asyncio.AbstractServer:
+    """Serve GET /metrics on `host:port` from the running event loop."""
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                status, body = "200 OK", registry.render().encode("utf-8")
+            else:
+                status, body = "404 Not Found", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    logger.info(f"📈 Serving metrics on http://{host}:{port}/metrics")
+    return server
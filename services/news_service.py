@@ -1,9 +1,147 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from dataclasses import dataclass, field
 from datetime import datetime
-from models.news import News
-async def insert_news_from_api_response(api_data: dict):
+from itertools import islice
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator, List, Optional, Union
+
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models.agent_response import NEWS_FETCHED, NEWS_ITEM, NewsFetched
+from models.news import News, NewsRecord, make_dedup_key
+from services import metrics
+from services.timing import Timer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+DEFAULT_WRITERS = 2
+DEFAULT_QUEUE_DEPTH = 4
+DUPLICATE_KEY_ERROR = 11000
+
+
+@dataclass
+class ChunkResult:
+    """Outcome of writing one chunk of News documents."""
+    index: int
+    size: int
+    inserted: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+# on_invalid(preference_name, articles, error) for articles that fail validation
+InvalidHandler = Callable[[Optional[str], int, Exception], None]
+
+
+@dataclass
+class BulkInsertReport:
+    """Per-chunk results of a bulk ingestion run, plus the articles skipped as invalid."""
+    chunks: List[ChunkResult] = field(default_factory=list)
+    invalid: int = 0
+
+    @property
+    def total(self) -> int:
+        return sum(chunk.size for chunk in self.chunks) + self.invalid
+
+    @property
+    def inserted(self) -> int:
+        return sum(chunk.inserted for chunk in self.chunks)
+
+    @property
+    def duplicates(self) -> int:
+        return sum(chunk.duplicates for chunk in self.chunks)
+
+    @property
+    def failed(self) -> int:
+        return self.write_failed + self.invalid
+
+    @property
+    def write_failed(self) -> int:
+        """Failed writes only: unlike invalid articles, these may succeed when ingested again."""
+        return sum(chunk.failed for chunk in self.chunks)
+
+    def skip_invalid(self, preference_name: Optional[str], articles: int, error: Exception):
+        """InvalidHandler counting the skipped articles as failed."""
+        self.invalid += articles
+        metrics.ARTICLES.inc(articles, preference=preference_name or "", result="failed")
+        log_invalid(preference_name, articles, error)
+
+
+def log_invalid(preference_name: Optional[str], articles: int, error: Exception):
+    if isinstance(error, ValidationError):
+        reason = "; ".join(f"{'.'.join(map(str, err['loc'])) or 'value'}: {err['msg']}" for err in error.errors()[:3])
+    else:
+        reason = str(error)
+    logger.warning(f"⚠️ Skipping {articles} invalid article(s) of {preference_name!r}: {reason}")
+
+
+def records_from_fetched(fetched: NewsFetched) -> Iterator[NewsRecord]:
+    """Yield the articles of one validated news_fetched block."""
+    preference_name = fetched["name"]
+    news_datetime = datetime.utcfromtimestamp(fetched["datetime"])
+
+    for item in fetched.get("news", []):
+        heading = item["heading"]
+        src = item.get("src", [])
+        yield NewsRecord(
+            preference_name=preference_name,
+            heading=heading,
+            description=item["news"],
+            news_datetime=news_datetime,
+            image=item.get("image", ""),
+            src=src,
+            dedup_key=make_dedup_key(heading, preference_name, src),
+        )
+
+
+def validated_records(fetched: dict, on_invalid: InvalidHandler = log_invalid) -> Iterator[NewsRecord]:
     """
-    Insert news from API response into MongoDB.
-    API format (simplified):
+    Yield the valid articles of one raw news_fetched block.
+
+    The block is validated in one call (models/agent_response.py). Only when
+    that fails are its articles validated one by one, so a malformed article
+    is reported to `on_invalid` and skipped while the rest are kept. A block
+    whose own fields (name, datetime) are malformed loses all its articles.
+    """
+    try:
+        block = NEWS_FETCHED.validate_python(fetched)
+    except ValidationError as e:
+        error = e
+    else:
+        yield from records_from_fetched(block)
+        return
+
+    items = fetched.get("news") if isinstance(fetched, dict) else None
+    if not isinstance(items, list):
+        on_invalid(fetched.get("name") if isinstance(fetched, dict) else None, len(items or []) or 1, error)
+        return
+    try:
+        block = NEWS_FETCHED.validate_python({**fetched, "news": []})
+    except ValidationError as e:
+        on_invalid(fetched.get("name"), len(items) or 1, e)
+        return
+
+    valid = []
+    for item in items:
+        try:
+            valid.append(NEWS_ITEM.validate_python(item))
+        except ValidationError as e:
+            on_invalid(block["name"], 1, e)
+    yield from records_from_fetched({**block, "news": valid})
+
+
+def iter_news_from_api_response(api_data: dict, on_invalid: InvalidHandler = log_invalid) -> Iterator[NewsRecord]:
+    """
+    Yield NewsRecords from API response.
+
+    Malformed articles are skipped and reported to `on_invalid` (see
+    validated_records) instead of aborting the run. API format (simplified):
 
     {
         "response": [
@@ -32,31 +170,180 @@ async def insert_news_from_api_response(api_data: dict):
     """
 
     for preference_block in api_data.get("response", []):
-        agent_response = preference_block.get("agent_response", {})
-        news_fetched_list = agent_response.get("news_fetched", [])
+        for fetched in preference_block.get("agent_response", {}).get("news_fetched", []):
+            yield from validated_records(fetched, on_invalid)
+
 
-        # print("News_fetched list", news_fetched_list)
+async def _chunked(
+    news_docs: Union[Iterable[NewsRecord], AsyncIterable[NewsRecord]], chunk_size: int
+) -> AsyncIterator[List[NewsRecord]]:
+    if not hasattr(news_docs, "__aiter__"):
+        docs = iter(news_docs)
+        while chunk := list(islice(docs, chunk_size)):
+            yield chunk
+        return
 
-        for fetched in news_fetched_list:
-            preference_name = fetched.get("name")
-            timestamp = fetched.get("datetime")
-            news_datetime = datetime.utcfromtimestamp(timestamp)
+    chunk = []
+    async for news in news_docs:
+        chunk.append(news)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
-            for item in fetched.get("news", []):
-                heading = item.get("heading")
-                description = item.get("news")
-                image = item.get("image", "")
-                src = item.get("src", [])
 
+def _upsert_op(news: NewsRecord, inserted_at: datetime) -> UpdateOne:
+    return UpdateOne(
+        {"dedup_key": news.dedup_key},
+        {"$setOnInsert": news.to_document(inserted_at)},
+        upsert=True,
+    )
 
-                news_data = News(
-                        preference_name=preference_name,
-                        heading=heading,
-                        description=description,
-                        news_datetime=news_datetime,
-                        image=image,
-                        src=src
 
-                )
+async def _write_chunk(collection, index: int, chunk: List[NewsRecord], ops: List[UpdateOne], timer: Timer) -> ChunkResult:
+    result = ChunkResult(index=index, size=len(chunk))
+    # Per-document outcome; anything not upserted or failed was already stored
+    outcomes = ["duplicate"] * len(chunk)
+    started = time.perf_counter()
+    try:
+        with timer.span("bulk_write"):
+            written = await collection.bulk_write(ops, ordered=False)
+        for i in written.upserted_ids:
+            outcomes[i] = "inserted"
+    except BulkWriteError as e:
+        for upserted in e.details.get("upserted", []):
+            outcomes[upserted["index"]] = "inserted"
+        # A concurrent run upserting the same key loses with E11000: already stored
+        for err in e.details.get("writeErrors", []):
+            if err.get("code") != DUPLICATE_KEY_ERROR:
+                outcomes[err["index"]] = "failed"
+                result.errors.append(err.get("errmsg", ""))
+        metrics.BULK_WRITE_FAILURES.inc(outcomes.count("failed"), kind="write_error")
+    except Exception as e:
+        outcomes = ["failed"] * len(chunk)
+        result.errors = [str(e)]
+        metrics.BULK_WRITE_FAILURES.inc(len(chunk), kind=type(e).__name__)
+    metrics.BULK_WRITE_DURATION.observe(time.perf_counter() - started)
+
+    result.inserted = outcomes.count("inserted")
+    result.duplicates = outcomes.count("duplicate")
+    result.failed = outcomes.count("failed")
+    for (preference, outcome), count in Counter(
+        (news.preference_name, outcome) for news, outcome in zip(chunk, outcomes)
+    ).items():
+        metrics.ARTICLES.inc(count, preference=preference, result=outcome)
+
+    if result.failed:
+        logger.warning(
+            f"⚠️ Chunk {result.index}: {result.inserted} inserted, "
+            f"{result.duplicates} duplicates, {result.failed} failed "
+            f"({'; '.join(result.errors[:3])})"
+        )
+    else:
+        logger.info(
+            f"Chunk {result.index}: {result.inserted} inserted, "
+            f"{result.duplicates} duplicates of {result.size}"
+        )
+    return result
+
+
+async def bulk_upsert_news(
+    news_docs: Union[Iterable[NewsRecord], AsyncIterable[NewsRecord]],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    timer: Optional[Timer] = None,
+    writers: int = DEFAULT_WRITERS,
+    queue_depth: int = DEFAULT_QUEUE_DEPTH,
+    on_chunk: Optional[Callable[[ChunkResult, List[NewsRecord]], None]] = None,
+    report: Optional[BulkInsertReport] = None,
+) -> BulkInsertReport:
+    """
+    Upsert NewsRecords by dedup_key with unordered bulk writes of `chunk_size`.
+
+    Articles already stored are matched and left untouched ($setOnInsert), so
+    re-ingesting a payload writes nothing new. A failing document (or a failing
+    chunk) is counted in the report instead of aborting the run.
 
-                await news_data.insert()
+    Runs as a pipeline: this coroutine builds chunks from `news_docs` (an
+    iterable or async iterable, e.g. a stream still downloading) into a queue
+    of at most `queue_depth` chunks, and `writers` tasks drain it with
+    concurrent bulk_writes. A full queue blocks the producer, so memory stays
+    bounded when Mongo is the bottleneck. If producing fails, the chunks
+    already queued are still written before the error propagates.
+
+    `timer` receives "build_docs" (producing the documents, including download
+    and parsing when streaming), "queue_wait" and "bulk_write" spans, summed
+    over writers, plus an "articles" count. `on_chunk(result, records)` is
+    called after each chunk is written. The chunks are added to `report` if
+    given (e.g. one already counting the invalid articles of `news_docs`).
+    """
+    report = report if report is not None else BulkInsertReport()
+    timer = timer or Timer()
+    collection = News.get_motor_collection()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, queue_depth))
+
+    async def write():
+        while (item := await queue.get()) is not None:
+            index, chunk, ops, queued_at = item
+            waited = time.perf_counter() - queued_at
+            timer.add("queue_wait", waited)
+            metrics.INGEST_QUEUE_WAIT.observe(waited)
+            metrics.INGEST_QUEUE_DEPTH.set(queue.qsize())
+            result = await _write_chunk(collection, index, chunk, ops, timer)
+            report.chunks.append(result)
+            if on_chunk is not None:
+                on_chunk(result, chunk)
+
+    async def finish():
+        for _ in tasks:
+            await queue.put(None)
+        await asyncio.gather(*tasks)
+
+    tasks = [asyncio.create_task(write()) for _ in range(max(1, writers))]
+    try:
+        chunks = _chunked(news_docs, chunk_size)
+        index = 0
+        while True:
+            with timer.span("build_docs"):
+                chunk = await anext(chunks, None)
+                if chunk is None:
+                    break
+                inserted_at = datetime.utcnow()
+                ops = [_upsert_op(news, inserted_at) for news in chunk]
+            timer.count("articles", len(chunk))
+            await queue.put((index, chunk, ops, time.perf_counter()))
+            metrics.INGEST_QUEUE_DEPTH.set(queue.qsize())
+            index += 1
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    except Exception:
+        await finish()
+        raise
+    await finish()
+
+    report.chunks.sort(key=lambda chunk: chunk.index)
+    return report
+
+
+async def insert_news_from_api_response(
+    api_data: dict,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    timer: Optional[Timer] = None,
+    writers: int = DEFAULT_WRITERS,
+    queue_depth: int = DEFAULT_QUEUE_DEPTH,
+) -> BulkInsertReport:
+    """
+    Insert news from API response into MongoDB.
+
+    Articles are upserted by dedup_key in bulk chunks, so running the same
+    payload twice adds no documents. Malformed articles are skipped and
+    counted as failed. See iter_news_from_api_response for the payload format.
+    """
+    report = BulkInsertReport()
+    return await bulk_upsert_news(
+        iter_news_from_api_response(api_data, on_invalid=report.skip_invalid),
+        chunk_size=chunk_size, timer=timer, writers=writers, queue_depth=queue_depth, report=report,
+    )
@@ -0,0 +1,120 @@
+import logging
+from typing import AsyncIterable, AsyncIterator, List, Optional
+
+from pydantic import ValidationError
+
+from models.agent_response import NEWS_FETCHED
+from models.news import NewsRecord
+from services.news_service import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_QUEUE_DEPTH, DEFAULT_WRITERS, BulkInsertReport, InvalidHandler, bulk_upsert_news,
+    log_invalid, records_from_fetched,
+)
+from services.timing import Timer
+
+try:
+    import ijson
+    from ijson.common import ObjectBuilder
+except ImportError:  # streaming is optional; cron.py falls back to resp.json()
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+FETCHED_PREFIX = "response.item.agent_response.news_fetched.item"
+NAME_PREFIX = f"{FETCHED_PREFIX}.name"
+DATETIME_PREFIX = f"{FETCHED_PREFIX}.datetime"
+ITEM_PREFIX = f"{FETCHED_PREFIX}.news.item"
+
+
+class AsyncByteReader:
+    """Adapts an async iterator of byte chunks to the async read() ijson expects."""
+
+    def __init__(self, chunks: AsyncIterable[bytes]):
+        self._chunks = chunks.__aiter__()
+        self._buffer = b""
+        self.bytes_read = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        while not self._buffer:
+            try:
+                self._buffer = await self._chunks.__anext__()
+            except StopAsyncIteration:
+                return b""
+            self.bytes_read += len(self._buffer)
+
+        if size < 0 or size >= len(self._buffer):
+            data, self._buffer = self._buffer, b""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _news_from_item(
+    item: dict, preference_name: Optional[str], timestamp: Optional[float], on_invalid: InvalidHandler
+) -> Optional[NewsRecord]:
+    # Validated as a one-article news_fetched block, the same schema the buffered path uses
+    try:
+        fetched = NEWS_FETCHED.validate_python({"name": preference_name, "datetime": timestamp, "news": [item]})
+    except ValidationError as e:
+        on_invalid(preference_name, 1, e)
+        return None
+    return next(records_from_fetched(fetched))
+
+
+async def aiter_news_from_stream(
+    reader: AsyncByteReader, on_invalid: InvalidHandler = log_invalid
+) -> AsyncIterator[NewsRecord]:
+    """
+    Yield NewsRecords while the agent response is still downloading.
+
+    Walks response[].agent_response.news_fetched[].news[] with ijson events.
+    Items are yielded as soon as their news_fetched block's name and datetime
+    are known; items seen before those keys are held until the block closes.
+    Malformed items are reported to `on_invalid` and skipped, as in
+    iter_news_from_api_response.
+    """
+    preference_name = None
+    timestamp = None
+    pending: List[dict] = []
+    builder = None
+
+    async for prefix, event, value in ijson.parse_async(reader, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == ITEM_PREFIX and event == "end_map":
+                item, builder = builder.value, None
+                if timestamp is None or preference_name is None:
+                    pending.append(item)
+                elif (news := _news_from_item(item, preference_name, timestamp, on_invalid)) is not None:
+                    yield news
+            continue
+
+        if prefix == ITEM_PREFIX and event == "start_map":
+            builder = ObjectBuilder()
+            builder.event(event, value)
+        elif prefix == NAME_PREFIX:
+            preference_name = value
+        elif prefix == DATETIME_PREFIX:
+            timestamp = value
+        elif prefix == FETCHED_PREFIX and event == "start_map":
+            preference_name, timestamp, pending = None, None, []
+        elif prefix == FETCHED_PREFIX and event == "end_map" and pending:
+            # Without a name or datetime every item fails validation, and is skipped
+            for item in pending:
+                if (news := _news_from_item(item, preference_name, timestamp, on_invalid)) is not None:
+                    yield news
+            pending = []
+
+
+async def ingest_news_stream(
+    reader: AsyncByteReader,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    timer: Optional[Timer] = None,
+    writers: int = DEFAULT_WRITERS,
+    queue_depth: int = DEFAULT_QUEUE_DEPTH,
+) -> BulkInsertReport:
+    """Incremental counterpart of insert_news_from_api_response."""
+    report = BulkInsertReport()
+    return await bulk_upsert_news(
+        aiter_news_from_stream(reader, on_invalid=report.skip_invalid),
+        chunk_size=chunk_size, timer=timer, writers=writers, queue_depth=queue_depth, report=report,
+    )
@@ -0,0 +1,142 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from pymongo import ASCENDING
+
+logger = logging.getLogger(__name__)
+
+COMPRESSLEVEL = 6
+MAX_DOCUMENT_BYTES = 15 * 1024 * 1024  # stay under MongoDB's 16 MB document limit
+
+
+def cache_key(
+    app_name: str, user_id: Optional[str], query: str, model_name: str, preference: Optional[str] = None
+) -> str:
+    # session_id is left out on purpose: it changes every run. No user_id: shared by every user
+    raw = json.dumps([app_name, user_id, query, model_name, preference], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Agent response bodies in a MongoDB collection, gzipped, kept for `ttl`
+    seconds after they were stored.
+
+    The cache is bounded by `max_entries` and `max_bytes` (compressed). The
+    collection's size is tracked incrementally by put() and recounted only
+    when the limits look exceeded, or every `resync` seconds to pick up other
+    processes' writes and TTL deletions; the least recently used entries are
+    then evicted until both limits hold. A body larger than `max_entry_bytes`
+    compressed is not cached.
+    """
+
+    def __init__(
+        self,
+        collection,
+        ttl: float,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_entry_bytes: int = MAX_DOCUMENT_BYTES,
+        resync: float = 300,
+    ):
+        self.collection = collection
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, MAX_DOCUMENT_BYTES)
+        self.resync = resync
+        self.entries: Optional[int] = None  # estimated; None until first counted
+        self.bytes: Optional[int] = None
+        self._counted_at = float("-inf")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        now = datetime.utcnow()
+        entry = await self.collection.find_one_and_update(
+            {"_id": key, "expires_at": {"$gt": now}},
+            {"$set": {"last_used_at": now}, "$inc": {"hits": 1}},
+            projection={"body": 1},
+        )
+        if entry is None:
+            return None
+        return await asyncio.to_thread(gzip.decompress, entry["body"])
+
+    async def put(self, key: str, body: bytes, **meta) -> bool:
+        """Store `body` under `key`; `meta` (user_id, query, ...) is kept for inspection. Returns False if too large."""
+        compressed = await asyncio.to_thread(gzip.compress, body, COMPRESSLEVEL)
+        if len(compressed) > self.max_entry_bytes:
+            logger.info(f"Response of {len(compressed)} bytes (gzipped) is too large to cache")
+            return False
+        now = datetime.utcnow()
+        previous = await self.collection.find_one_and_replace(
+            {"_id": key},
+            {
+                **meta,
+                "body": compressed,
+                "size": len(compressed),
+                "created_at": now,
+                "last_used_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl),
+                "hits": 0,
+            },
+            projection={"size": 1},
+            upsert=True,
+        )
+        if self.max_entries is None and self.max_bytes is None:
+            return True
+        if self.entries is not None:
+            if previous is None:
+                self.entries += 1
+            self.bytes += len(compressed) - (previous or {}).get("size", 0)
+        if self.entries is None or time.monotonic() - self._counted_at >= self.resync:
+            await self.count()
+        if self.over_limits():
+            await self.evict()
+        return True
+
+    async def count(self):
+        """Recount the entries and bytes in the collection (a full scan)."""
+        self.entries = await self.collection.count_documents({})
+        totals = await self.collection.aggregate([
+            {"$group": {"_id": None, "bytes": {"$sum": "$size"}}},
+        ]).to_list(1)
+        self.bytes = totals[0]["bytes"] if totals else 0
+        self._counted_at = time.monotonic()
+
+    def over_limits(self) -> bool:
+        return (self.max_entries is not None and self.entries > self.max_entries) or (
+            self.max_bytes is not None and self.bytes > self.max_bytes
+        )
+
+    async def evict(self) -> int:
+        """Recount, then drop least recently used entries until the limits hold. Returns how many were dropped."""
+        await self.count()
+        evicted = []
+        freed = 0
+        if self.max_entries is not None and self.entries > self.max_entries:
+            cursor = self.collection.find({}, {"size": 1}).sort("last_used_at", ASCENDING).limit(
+                self.entries - self.max_entries
+            )
+            async for entry in cursor:
+                evicted.append(entry["_id"])
+                freed += entry["size"]
+
+        if self.max_bytes is not None and self.bytes - freed > self.max_bytes:
+            cursor = self.collection.find({"_id": {"$nin": evicted}}, {"size": 1}).sort("last_used_at", ASCENDING)
+            async for entry in cursor:
+                if self.bytes - freed <= self.max_bytes:
+                    break
+                evicted.append(entry["_id"])
+                freed += entry["size"]
+
+        if evicted:
+            await self.collection.delete_many({"_id": {"$in": evicted}})
+            self.entries -= len(evicted)
+            self.bytes -= freed
+            logger.info(f"🧹 Evicted {len(evicted)} cached response(s)")
+        return len(evicted)
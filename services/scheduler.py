@@ -0,0 +1,167 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# (name, low, high) for minute, hour, day of month, month, day of week
+CRON_FIELDS = [
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 7),  # 0 and 7 are both Sunday
+]
+
+
+def _parse_field(spec: str, name: str, low: int, high: int) -> Set[int]:
+    values = set()
+    for part in spec.split(","):
+        range_part, _, step_part = part.partition("/")
+        step = int(step_part) if step_part else 1
+        if range_part == "*":
+            start, end = low, high
+        elif "-" in range_part:
+            start, end = (int(v) for v in range_part.split("-", 1))
+        else:
+            start = int(range_part)
+            end = high if step_part else start
+        if step < 1 or not (low <= start <= end <= high):
+            raise ValueError(f"Invalid cron {name} field: {part!r}")
+        values.update(range(start, end + 1, step))
+    if name == "weekday":
+        values = {v % 7 for v in values}
+    return values
+
+
+class CronSchedule:
+    """Standard 5-field cron expression (minute hour day month weekday), UTC."""
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields, got {expression!r}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = (
+            _parse_field(spec, name, low, high)
+            for spec, (name, low, high) in zip(parts, CRON_FIELDS)
+        )
+        # Cron ORs day-of-month and day-of-week when both are restricted
+        self._any_day = parts[2] == "*"
+        self._any_weekday = parts[4] == "*"
+
+    def _day_matches(self, dt: datetime) -> bool:
+        weekday = (dt.weekday() + 1) % 7  # cron counts from Sunday
+        day_ok = dt.day in self.days
+        weekday_ok = weekday in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, now: datetime) -> datetime:
+        dt = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = dt + timedelta(days=366 * 5)
+
+        while dt < limit:
+            if dt.month not in self.months:
+                year, month = (dt.year + 1, 1) if dt.month == 12 else (dt.year, dt.month + 1)
+                dt = dt.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(dt):
+                dt = (dt + timedelta(days=1)).replace(hour=0, minute=0)
+            elif dt.hour not in self.hours:
+                dt = (dt + timedelta(hours=1)).replace(minute=0)
+            elif dt.minute not in self.minutes:
+                dt += timedelta(minutes=1)
+            else:
+                return dt
+        raise ValueError(f"Cron expression {self.expression!r} never fires")
+
+    def __str__(self):
+        return f"cron({self.expression})"
+
+
+class IntervalSchedule:
+    """Fire every `seconds` seconds, starting immediately."""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError("Interval must be positive")
+        self.seconds = seconds
+        self._first = True
+
+    def next_after(self, now: datetime) -> datetime:
+        if self._first:
+            self._first = False
+            return now
+        return now + timedelta(seconds=self.seconds)
+
+    def __str__(self):
+        return f"every {self.seconds:g}s"
+
+
+class Scheduler:
+    """
+    Runs coroutine jobs on their schedules in the current event loop.
+
+    A tick that arrives while the previous run of the same job is still in
+    progress is skipped, so one job never overlaps itself. stop() lets the
+    running jobs finish (up to `grace_seconds`) before run() returns.
+    """
+
+    def __init__(self, grace_seconds: float = 300):
+        self.grace_seconds = grace_seconds
+        self._jobs: Dict[str, tuple] = {}
+        self._running: Dict[str, asyncio.Task] = {}
+        self._stop = asyncio.Event()
+
+    def add_job(self, name: str, schedule, job: Callable[[], Awaitable]):
+        self._jobs[name] = (schedule, job)
+
+    def stop(self):
+        self._stop.set()
+
+    async def _loop(self, name: str, schedule, job: Callable[[], Awaitable]):
+        while not self._stop.is_set():
+            now = datetime.now(timezone.utc)
+            fire_at = schedule.next_after(now)
+            try:
+                await asyncio.wait_for(self._stop.wait(), timeout=(fire_at - now).total_seconds())
+                break  # stop requested while waiting
+            except asyncio.TimeoutError:
+                pass
+
+            running = self._running.get(name)
+            if running is not None and not running.done():
+                logger.warning(f"⏭️ Skipping {name}: previous run still in progress")
+                continue
+
+            logger.info(f"⏰ Running scheduled job {name}")
+            self._running[name] = asyncio.create_task(self._run(name, job))
+
+    async def _run(self, name: str, job: Callable[[], Awaitable]):
+        try:
+            await job()
+        except Exception as e:
+            logger.exception(f"❌ Scheduled job {name} failed: {e}")
+
+    async def run(self):
+        for name, (schedule, _) in self._jobs.items():
+            logger.info(f"Scheduled {name}: {schedule}")
+        await asyncio.gather(*(self._loop(name, *spec) for name, spec in self._jobs.items()))
+
+        pending: List[asyncio.Task] = [t for t in self._running.values() if not t.done()]
+        if pending:
+            logger.info(f"Waiting up to {self.grace_seconds:g}s for {len(pending)} running job(s)")
+            done, not_done = await asyncio.wait(pending, timeout=self.grace_seconds)
+            for task in not_done:
+                task.cancel()
+            await asyncio.gather(*not_done, return_exceptions=True)
+
+
+def build_schedule(interval: Optional[float] = None, cron: Optional[str] = None):
+    if cron:
+        return CronSchedule(cron)
+    if interval:
+        return IntervalSchedule(interval)
+    raise ValueError("Either an interval or a cron expression is required")
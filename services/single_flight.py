@@ -0,0 +1,56 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+
+class SharedCallError(Exception):
+    """Raised in the callers that joined a call when that call failed."""
+
+
+def coalesce_key(preference: str, model_name: str, query: str) -> str:
+    # Case and whitespace differences don't change what the agent is asked for
+    return "\x1f".join((preference.strip().casefold(), model_name, " ".join(query.split()).casefold()))
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller leads
+    (lead(), then resolve() or fail()), later callers join() its future and
+    share the result. A successful result stays joinable for `linger`
+    seconds, so calls arriving just after it finished share it too.
+    """
+
+    def __init__(self, linger: float = 0.0):
+        self.linger = linger
+        self._flights: Dict[str, asyncio.Future] = {}
+
+    def join(self, key: str) -> Optional[asyncio.Future]:
+        future = self._flights.get(key)
+        if future is not None and future.get_loop() is not asyncio.get_running_loop():
+            # Left over from an event loop that is gone
+            del self._flights[key]
+            return None
+        return future
+
+    def lead(self, key: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = future
+        return future
+
+    def resolve(self, key: str, future: asyncio.Future, result: Any):
+        if future.done():
+            return
+        future.set_result(result)
+        if self.linger:
+            future.get_loop().call_later(self.linger, self._forget, key, future)
+        else:
+            self._forget(key, future)
+
+    def fail(self, key: str, future: asyncio.Future, error: BaseException):
+        if not future.done():
+            future.set_exception(error)
+            future.exception()  # retrieved, even if nobody joined
+        self._forget(key, future)
+
+    def _forget(self, key: str, future: asyncio.Future):
+        if self._flights.get(key) is future:
+            del self._flights[key]
@@ -0,0 +1,143 @@
+import gzip
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterable, AsyncIterator, List
+from urllib.parse import quote, unquote
+
+logger = logging.getLogger(__name__)
+
+SUFFIX = ".json.gz"
+TMP_SUFFIX = ".tmp"
+SEPARATOR = "__"
+COMPRESSLEVEL = 6
+
+
+@dataclass
+class SpoolEntry:
+    session_id: str
+    user_id: str
+    path: Path
+
+
+class SpoolWriter:
+    """
+    Incrementally spools one response body. The file only appears under its
+    final name once the whole body has been written; until then it is a .tmp.
+    """
+
+    def __init__(self, path: Path, compresslevel: int = COMPRESSLEVEL):
+        self.path = path
+        self._tmp_path = path.with_name(path.name + TMP_SUFFIX)
+        self._file = gzip.open(self._tmp_path, "wb", compresslevel=compresslevel)
+        self.bytes_written = 0
+
+    def write(self, data: bytes):
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def commit(self) -> Path:
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        return self.path
+
+    def abort(self):
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+class Spool:
+    """
+    Raw agent response bodies, gzipped, one file per (session_id, user_id);
+    batch runs share a session_id across users.
+
+    A body is spooled before it is ingested and discarded once every article
+    was written, so whatever is left in the directory can be replayed without
+    calling the agent again. A body still being written is a .tmp file; one
+    left behind by a killed run is incomplete and removed by remove_stale().
+    """
+
+    def __init__(self, directory: str, compresslevel: int = COMPRESSLEVEL):
+        self.directory = Path(directory)
+        self.compresslevel = compresslevel
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path(self, session_id: str, user_id: str) -> Path:
+        if not session_id or SEPARATOR in session_id or "/" in session_id or session_id.startswith("."):
+            raise ValueError(f"Invalid session_id for the spool: {session_id!r}")
+        return self.directory / f"{session_id}{SEPARATOR}{quote(user_id, safe='')}{SUFFIX}"
+
+    def writer(self, session_id: str, user_id: str) -> SpoolWriter:
+        return SpoolWriter(self.path(session_id, user_id), self.compresslevel)
+
+    async def tee(self, session_id: str, user_id: str, chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        """
+        Pass `chunks` through while spooling them. The body is committed only
+        if `chunks` is exhausted; a partial body is thrown away. A spool write
+        error stops the spooling, not the stream.
+        """
+        try:
+            writer = self.writer(session_id, user_id)
+        except OSError as e:
+            logger.warning(f"⚠️ Spooling session_id={session_id} failed: {e}")
+            writer = None
+        complete = False
+        try:
+            async for chunk in chunks:
+                if writer is not None:
+                    try:
+                        writer.write(chunk)
+                    except OSError as e:
+                        logger.warning(f"⚠️ Spooling session_id={session_id} failed: {e}")
+                        writer.abort()
+                        writer = None
+                yield chunk
+            complete = True
+        finally:
+            if writer is not None:
+                if complete:
+                    writer.commit()
+                else:
+                    writer.abort()
+
+    def write(self, session_id: str, user_id: str, body: bytes) -> Path:
+        """Spool a complete body. Blocking; run it in a thread for large bodies."""
+        writer = self.writer(session_id, user_id)
+        try:
+            writer.write(body)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    def read(self, entry: SpoolEntry) -> bytes:
+        with gzip.open(entry.path, "rb") as f:
+            return f.read()
+
+    def discard(self, session_id: str, user_id: str):
+        self.path(session_id, user_id).unlink(missing_ok=True)
+
+    def remove_stale(self, older_than: float) -> int:
+        """Delete .tmp bodies not written to for `older_than` seconds. Returns how many were deleted."""
+        cutoff = time.time() - older_than
+        removed = 0
+        for path in self.directory.glob(f"*{SUFFIX}{TMP_SUFFIX}"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue  # committed or aborted meanwhile
+        if removed:
+            logger.warning(f"🧹 Removed {removed} partial spooled response(s) left in {self.directory}")
+        return removed
+
+    def entries(self) -> List[SpoolEntry]:
+        """Spooled responses, oldest first."""
+        entries = []
+        for path in sorted(self.directory.glob(f"*{SUFFIX}"), key=lambda p: p.stat().st_mtime):
+            session_id, _, user_id = path.name[: -len(SUFFIX)].partition(SEPARATOR)
+            entries.append(SpoolEntry(session_id=session_id, user_id=unquote(user_id), path=path))
+        return entries
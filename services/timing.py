@@ -0,0 +1,63 @@
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+# httpcore trace stages -> span names
+TRACE_STAGES = {
+    "connect_tcp": "connect",
+    "start_tls": "tls",
+    "receive_response_headers": "ttfb",
+    "receive_response_body": "download",
+}
+
+
+class Timer:
+    """Accumulates named stage durations (seconds) and counters for one run."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    @contextmanager
+    def span(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def count(self, name: str, value: int = 1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def merge(self, other: "Timer"):
+        for name, seconds in other.stages.items():
+            self.add(name, seconds)
+        for name, value in other.counts.items():
+            self.count(name, value)
+
+    def summary(self) -> str:
+        return ", ".join(f"{name}={seconds:.3f}s" for name, seconds in self.stages.items())
+
+
+def http_trace(timer: Timer):
+    """
+    httpcore trace hook (request.extensions["trace"]) that records connect,
+    TLS, time-to-first-byte and body download spans on `timer`.
+    """
+    marks = {}
+
+    async def trace(event_name: str, info: dict):
+        now = time.perf_counter()
+        stage, _, phase = event_name.rpartition(".")
+        if phase == "started":
+            marks[stage] = now
+        elif phase in ("complete", "failed") and stage in marks:
+            name = TRACE_STAGES.get(stage.split(".", 1)[-1])
+            started = marks.pop(stage)
+            if name:
+                timer.add(name, now - started)
+
+    return trace
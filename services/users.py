@@ -0,0 +1,38 @@
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List
+
+
+@dataclass
+class UserTarget:
+    """A user to run the agent for, optionally with its own preference list."""
+    user_id: str
+    preferences: List[str] = field(default_factory=list)
+
+
+def _to_target(entry) -> UserTarget:
+    if isinstance(entry, str):
+        return UserTarget(user_id=entry)
+    return UserTarget(user_id=str(entry["user_id"]), preferences=list(entry.get("preferences") or []))
+
+
+def load_users_file(path: str) -> List[UserTarget]:
+    """
+    Read users from a file: either a JSON list of user ids / {"user_id", "preferences"}
+    objects, or plain text with one user id per line (blank lines and # comments skipped).
+    """
+    text = Path(path).read_text(encoding="utf-8")
+    if text.lstrip().startswith("["):
+        return [_to_target(entry) for entry in json.loads(text)]
+    return [
+        UserTarget(user_id=line.strip())
+        for line in text.splitlines()
+        if line.strip() and not line.strip().startswith("#")
+    ]
+
+
+async def load_users_collection(db, collection_name: str) -> List[UserTarget]:
+    """Read users from documents shaped like {"user_id": ..., "preferences": [...]}."""
+    cursor = db[collection_name].find({}, {"_id": 0, "user_id": 1, "preferences": 1})
+    return [_to_target(doc) async for doc in cursor if doc.get("user_id")]
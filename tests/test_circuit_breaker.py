@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from services.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def breakers():
+    return mongomock_motor.AsyncMongoMockClient()["test"]["circuit_breakers"]
+
+
+async def state(collection) -> str:
+    return (await collection.find_one({"_id": "agent"}))["state"]
+
+
+async def fail(breaker: CircuitBreaker, times: int):
+    for _ in range(times):
+        await breaker.record(await breaker.allow(), ok=False)
+
+
+def test_opens_after_consecutive_failures():
+    async def main():
+        collection = breakers()
+        breaker = CircuitBreaker(collection, "agent", failure_threshold=3, reset_timeout=60)
+        await fail(breaker, 2)
+        await breaker.record(await breaker.allow(), ok=True)  # resets the streak
+        await fail(breaker, 2)
+        closed = await state(collection)
+        await fail(breaker, 1)
+        with pytest.raises(CircuitOpenError, match="open until"):
+            await breaker.allow()
+        return closed, await state(collection)
+
+    assert asyncio.run(main()) == (CLOSED, OPEN)
+
+
+def test_slow_calls_count_as_failures():
+    async def main():
+        collection = breakers()
+        breaker = CircuitBreaker(collection, "agent", failure_threshold=1, latency_threshold=1.0)
+        await breaker.record(await breaker.allow(), ok=True, latency=0.5)
+        fast = await state(collection)
+        await breaker.record(await breaker.allow(), ok=True, latency=2.0)
+        return fast, await state(collection)
+
+    assert asyncio.run(main()) == (CLOSED, OPEN)
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success():
+    async def main():
+        collection = breakers()
+        breaker = CircuitBreaker(collection, "agent", failure_threshold=1, reset_timeout=0)
+        other = CircuitBreaker(collection, "agent", failure_threshold=1, reset_timeout=0)
+        await fail(breaker, 1)
+        probe = await breaker.allow()
+        assert probe.probe and probe.transitions == ["open->half_open"]
+        assert await state(collection) == HALF_OPEN
+        with pytest.raises(CircuitOpenError, match="probe is in flight"):
+            await other.allow()
+        await breaker.record(probe, ok=True)
+        assert probe.transitions == ["open->half_open", "half_open->closed"]
+        return (await other.allow()).probe, await state(collection)
+
+    assert asyncio.run(main()) == (False, CLOSED)
+
+
+def test_failed_probe_opens_the_breaker_again():
+    async def main():
+        collection = breakers()
+        breaker = CircuitBreaker(collection, "agent", failure_threshold=1, reset_timeout=0)
+        await fail(breaker, 1)
+        probe = await breaker.allow()
+        await breaker.record(probe, ok=False)
+        return probe.transitions, await state(collection)
+
+    assert asyncio.run(main()) == (["open->half_open", "half_open->open"], OPEN)
+
+
+def test_abandoned_probe_is_replaced():
+    async def main():
+        collection = breakers()
+        crashed = CircuitBreaker(collection, "agent", failure_threshold=1, reset_timeout=0, probe_timeout=0.05)
+        await fail(crashed, 1)
+        abandoned = await crashed.allow()
+        assert abandoned.probe
+        other = CircuitBreaker(collection, "agent", failure_threshold=1, reset_timeout=0, probe_timeout=0.05)
+        with pytest.raises(CircuitOpenError):
+            await other.allow()
+        await asyncio.sleep(0.1)
+        probe = await other.allow()
+        await other.record(probe, ok=True)
+        # The abandoned probe's late report no longer changes the state
+        await crashed.record(abandoned, ok=False)
+        return probe.probe, await state(collection)
+
+    assert asyncio.run(main()) == (True, CLOSED)
@@ -0,0 +1,51 @@
+import asyncio
+import logging
+
+import pytest
+
+from services.indexes import ensure_indexes
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def run_twice(required_only: bool, caplog):
+    async def main():
+        from beanie import init_beanie
+        from models.news import News
+
+        db = mongomock_motor.AsyncMongoMockClient()["test"]
+        await init_beanie(database=db, document_models=[News], skip_indexes=True)
+        first = await ensure_indexes([News], required_only=required_only)
+        caplog.clear()
+        second = await ensure_indexes([News], required_only=required_only)
+        return first["news"], second["news"]
+
+    with caplog.at_level(logging.INFO, logger="services.indexes"):
+        return asyncio.run(main())
+
+
+def test_creates_missing_indexes_then_reports_them_as_existing(caplog):
+    first, second = run_twice(False, caplog)
+    assert first["created"] and not first["existing"] and not first["failed"]
+    assert sorted(second["existing"]) == sorted(first["created"]) and not second["created"]
+    assert all(f"news.{name} already exists" in caplog.text for name in second["existing"])
+
+
+def test_required_only_creates_the_unique_index_quietly(caplog):
+    first, second = run_twice(True, caplog)
+    assert first["created"] == second["existing"] == ["dedup_key_unique"]
+    assert "already exists" not in caplog.text
+
+
+def test_index_that_cannot_be_built_is_reported():
+    async def main():
+        from beanie import init_beanie
+        from models.news import News
+
+        db = mongomock_motor.AsyncMongoMockClient()["test"]
+        await db["news"].insert_many([{"dedup_key": "a"}, {"dedup_key": "a"}])
+        await init_beanie(database=db, document_models=[News], skip_indexes=True)
+        return (await ensure_indexes([News], required_only=True))["news"]
+
+    result = asyncio.run(main())
+    assert result["failed"] and not result["created"]
@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from services.job_queue import JobWorker, enqueue
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def jobs():
+    return mongomock_motor.AsyncMongoMockClient()["test"]["jobs"]
+
+
+def test_enqueue_keeps_an_existing_jobs_schedule():
+    async def main():
+        collection = jobs()
+        assert await enqueue(collection, "app:u1", "u1", [], 60)
+        await collection.update_one({"key": "app:u1"}, {"$set": {"next_run_at": datetime(2030, 1, 1)}})
+        assert not await enqueue(collection, "app:u1", "u1", [], 120)
+        return await collection.find_one({"key": "app:u1"})
+
+    job = asyncio.run(main())
+    assert (job["interval_seconds"], job["next_run_at"]) == (120, datetime(2030, 1, 1))
+
+
+def test_a_job_is_claimed_by_one_worker_at_a_time():
+    async def main():
+        collection = jobs()
+        await enqueue(collection, "app:u1", "u1", [], 60)
+        first = await JobWorker(collection, None, owner="a").claim()
+        second = await JobWorker(collection, None, owner="b").claim()
+        return first["lease_owner"], second
+
+    assert asyncio.run(main()) == ("a", None)
+
+
+def test_finished_job_is_rescheduled_and_released():
+    async def main():
+        collection = jobs()
+        await enqueue(collection, "app:u1", "u1", [], 60)
+
+        async def handler(job):
+            return "pass"
+
+        worker = JobWorker(collection, handler, owner="a")
+        await worker._execute(await worker.claim())
+        return await collection.find_one({"key": "app:u1"})
+
+    job = asyncio.run(main())
+    assert (job["lease_owner"], job["runs"], job["last_status"], job["failures"]) == (None, 1, "pass", 0)
+    assert job["next_run_at"] > datetime.utcnow() + timedelta(seconds=50)
+
+
+def test_failed_job_backs_off():
+    async def main():
+        collection = jobs()
+        await enqueue(collection, "app:u1", "u1", [], 3600)
+
+        async def handler(job):
+            raise RuntimeError("boom")
+
+        worker = JobWorker(collection, handler, retry_base=30, owner="a")
+        await worker._execute(await worker.claim())
+        return await collection.find_one({"key": "app:u1"})
+
+    job = asyncio.run(main())
+    assert (job["last_status"], job["failures"]) == ("fail", 1)
+    assert job["next_run_at"] < datetime.utcnow() + timedelta(seconds=31)
+
+
+def test_job_is_cancelled_when_its_lease_is_lost():
+    async def main():
+        collection = jobs()
+        await enqueue(collection, "app:u1", "u1", [], 60)
+        cancelled = []
+
+        async def handler(job):
+            try:
+                await asyncio.sleep(30)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "pass"
+
+        worker = JobWorker(collection, handler, lease_seconds=0.15, owner="a")
+        execute = asyncio.create_task(worker._execute(await worker.claim()))
+        await asyncio.sleep(0.01)
+        # Another worker took it over, e.g. after this one stalled past its lease
+        await collection.update_one({"key": "app:u1"}, {"$set": {"lease_owner": "b"}})
+        await asyncio.wait_for(execute, 1)
+        return cancelled, await collection.find_one({"key": "app:u1"})
+
+    cancelled, job = asyncio.run(main())
+    assert cancelled == [True]
+    assert job["lease_owner"] == "b" and job["runs"] == 0  # left to the new owner
+
+
+def test_job_cancelled_on_shutdown_is_handed_back():
+    async def main():
+        collection = jobs()
+        await enqueue(collection, "app:u1", "u1", [], 60)
+
+        async def handler(job):
+            await asyncio.sleep(30)
+
+        worker = JobWorker(collection, handler, owner="a")
+        execute = asyncio.create_task(worker._execute(await worker.claim()))
+        await asyncio.sleep(0.01)
+        execute.cancel()
+        await asyncio.gather(execute, return_exceptions=True)
+        return execute.cancelled(), await collection.find_one({"key": "app:u1"})
+
+    cancelled, job = asyncio.run(main())
+    assert cancelled and job["lease_owner"] is None
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from services.leases import Lease
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def collection():
+    return mongomock_motor.AsyncMongoMockClient()["test"]["leases"]
+
+
+def test_second_owner_cannot_acquire_a_held_lease():
+    async def main():
+        leases = collection()
+        first = Lease(leases, "job", ttl=60, owner="a")
+        second = Lease(leases, "job", ttl=60, owner="b")
+        assert await first.acquire()
+        assert not await second.acquire()
+        assert second.holder == "a"
+        await first.release()
+        assert await second.acquire()
+        await second.release()
+        return await leases.count_documents({})
+
+    assert asyncio.run(main()) == 0
+
+
+def test_acquire_waits_for_the_lease_to_be_released():
+    async def main():
+        leases = collection()
+        first = Lease(leases, "job", ttl=60, owner="a")
+        await first.acquire()
+        asyncio.get_running_loop().call_later(0.05, lambda: asyncio.ensure_future(first.release()))
+        second = Lease(leases, "job", ttl=60, owner="b")
+        acquired = await second.acquire(wait=1, poll_interval=0.02)
+        await second.release()
+        return acquired
+
+    assert asyncio.run(main())
+
+
+def test_expired_lease_can_be_taken_over():
+    async def main():
+        leases = collection()
+        first = Lease(leases, "job", ttl=0.05, owner="a")
+        await first._try_acquire()  # no heartbeat: behaves like a crashed holder
+        await asyncio.sleep(0.1)
+        second = Lease(leases, "job", ttl=60, owner="b")
+        acquired = await second.acquire()
+        await second.release()
+        return acquired
+
+    assert asyncio.run(main())
+
+
+def test_heartbeat_keeps_the_lease():
+    async def main():
+        leases = collection()
+        lease = Lease(leases, "job", ttl=0.15, owner="a")
+        await lease.acquire()
+        await asyncio.sleep(0.3)  # twice the ttl
+        taken = await Lease(leases, "job", ttl=60, owner="b").acquire()
+        lost = lease.lost
+        await lease.release()
+        return taken, lost
+
+    assert asyncio.run(main()) == (False, False)
+
+
+def test_lost_lease_calls_on_lost_and_stops_renewing():
+    async def main():
+        leases = collection()
+        lost_calls = []
+        lease = Lease(leases, "job", ttl=0.15, owner="a", on_lost=lambda: lost_calls.append(True))
+        await lease.acquire()
+        # Another owner took it over, e.g. after this one stalled past its ttl
+        await leases.update_one({"_id": "job"}, {"$set": {"owner": "b"}})
+        await asyncio.sleep(0.2)
+        heartbeat_done = lease._heartbeat.done()
+        await lease.release()
+        return lease.lost, lost_calls, heartbeat_done, await leases.find_one({"_id": "job"})
+
+    lost, lost_calls, heartbeat_done, document = asyncio.run(main())
+    assert lost and lost_calls == [True] and heartbeat_done
+    assert document["owner"] == "b"  # release() leaves the new owner's lease alone
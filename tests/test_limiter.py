@@ -0,0 +1,134 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services.agent_client import RetryPolicy, send_with_retries
+from services.limiter import DROP, IGNORE, OK, AdaptiveLimiter
+
+
+async def settle():
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+def test_starts_at_max_limit_by_default():
+    assert AdaptiveLimiter(max_limit=8).limit == 8
+    assert AdaptiveLimiter(initial=50, min_limit=2, max_limit=8).limit == 8
+    assert AdaptiveLimiter(initial=0, min_limit=2, max_limit=8).limit == 2
+
+
+def test_waiters_get_slots_in_order():
+    async def main():
+        limiter = AdaptiveLimiter(max_limit=1)
+        slot = await limiter.acquire()
+        order = []
+
+        async def waiter(name):
+            s = await limiter.acquire()
+            order.append(name)
+            limiter.release(s, 0.1, IGNORE)
+
+        tasks = [asyncio.create_task(waiter(n)) for n in "abc"]
+        await settle()
+        assert order == [] and len(limiter._waiters) == 3
+        limiter.release(slot, 0.1, IGNORE)
+        await asyncio.gather(*tasks)
+        return order, limiter.inflight
+
+    assert asyncio.run(main()) == (list("abc"), 0)
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        limiter = AdaptiveLimiter(max_limit=1)
+        slot = await limiter.acquire()
+        task = asyncio.create_task(limiter.acquire())
+        await settle()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert not limiter._waiters
+        limiter.release(slot, 0.1, IGNORE)
+        return limiter.inflight
+
+    assert asyncio.run(main()) == 0
+
+
+def test_slot_granted_to_a_cancelled_waiter_is_handed_on():
+    async def main():
+        limiter = AdaptiveLimiter(max_limit=1)
+        slot = await limiter.acquire()
+        cancelled = asyncio.create_task(limiter.acquire())
+        next_in_line = asyncio.create_task(limiter.acquire())
+        await settle()
+        # Granted and cancelled before the waiter could run
+        limiter.release(slot, 0.1, IGNORE)
+        cancelled.cancel()
+        await asyncio.gather(cancelled, return_exceptions=True)
+        handed_on = await asyncio.wait_for(next_in_line, 1)
+        limiter.release(handed_on, 0.1, IGNORE)
+        return cancelled.cancelled(), limiter.inflight
+
+    assert asyncio.run(main()) == (True, 0)
+
+
+def test_call_cancelled_while_holding_a_slot_releases_it():
+    async def main():
+        limiter = AdaptiveLimiter(max_limit=1)
+        started = asyncio.Event()
+
+        async def handler(request):
+            started.set()
+            await asyncio.sleep(30)
+            return httpx.Response(200)
+
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            call = asyncio.create_task(
+                send_with_retries(client, "http://agent.test", {}, RetryPolicy(retries=0), [], limiter=limiter)
+            )
+            await asyncio.wait_for(started.wait(), 1)
+            assert limiter.inflight == 1
+            call.cancel()
+            await asyncio.gather(call, return_exceptions=True)
+        return limiter.inflight, limiter.limit
+
+    # Released without counting as an overload signal
+    assert asyncio.run(main()) == (0, 1)
+
+
+def test_overload_halves_the_limit_once_per_burst():
+    async def main():
+        limiter = AdaptiveLimiter(max_limit=16)
+        slots = [await limiter.acquire() for _ in range(4)]
+        for slot in slots:
+            limiter.release(slot, 1.0, DROP)
+        return limiter.limit
+
+    assert asyncio.run(main()) == 8
+
+
+def test_grows_only_while_the_limit_is_used():
+    async def main():
+        limiter = AdaptiveLimiter(initial=4, max_limit=16)
+        for _ in range(8):
+            limiter.release(await limiter.acquire(), 0.1, OK)  # one call in flight out of 4
+        idle = limiter.limit
+        for _ in range(8):
+            slots = [await limiter.acquire() for _ in range(int(limiter.limit))]
+            for slot in slots:
+                limiter.release(slot, 0.1, OK)
+        return idle, limiter.limit
+
+    idle, busy = asyncio.run(main())
+    assert idle == 4
+    assert busy > 4
+
+
+def test_latency_above_tolerance_shrinks_the_limit():
+    async def main():
+        limiter = AdaptiveLimiter(max_limit=10, tolerance=2.0)
+        limiter.release(await limiter.acquire(), 0.1, OK)
+        limiter.release(await limiter.acquire(), 5.0, OK)
+        return limiter.limit
+
+    assert asyncio.run(main()) == pytest.approx(9)
@@ -0,0 +1,109 @@
+import asyncio
+import json
+
+import pytest
+
+from services.news_service import BulkInsertReport, iter_news_from_api_response
+
+
+def article(heading: str, **fields) -> dict:
+    return {"heading": heading, "news": f"{heading} body", "image": None, "src": [f"https://example.com/{heading}"], **fields}
+
+
+def response(*blocks: dict) -> dict:
+    return {"response": [{"preference": "Science", "agent_response": {"news_fetched": list(blocks)}}]}
+
+
+def block(name: str, news: list, **fields) -> dict:
+    return {"name": name, "description": "...", "datetime": 1727881200, "news": news, **fields}
+
+
+def collect_invalid():
+    invalid = []
+    return invalid, lambda preference_name, articles, error: invalid.append((preference_name, articles))
+
+
+MALFORMED = response(
+    block("Science", [article("a"), {"heading": "no body"}, article("c")]),
+    block("Sports", [article("d")]),
+)
+
+
+def test_buffered_parser_skips_a_malformed_article():
+    invalid, on_invalid = collect_invalid()
+    records = list(iter_news_from_api_response(MALFORMED, on_invalid))
+    assert [r.heading for r in records] == ["a", "c", "d"]
+    assert invalid == [("Science", 1)]
+
+
+def test_buffered_parser_drops_a_block_without_datetime():
+    data = response({"name": "Science", "news": [article("a"), article("b")]}, block("Sports", [article("c")]))
+    invalid, on_invalid = collect_invalid()
+    assert [r.heading for r in iter_news_from_api_response(data, on_invalid)] == ["c"]
+    assert invalid == [("Science", 2)]
+
+
+def test_report_counts_skipped_articles_as_failed():
+    report = BulkInsertReport()
+    list(iter_news_from_api_response(MALFORMED, report.skip_invalid))
+    assert (report.invalid, report.failed, report.write_failed, report.total) == (1, 1, 0, 1)
+
+
+# Streaming parser (STREAM_PARSE); ijson is optional
+
+async def stream_records(data: dict, chunk_size: int, on_invalid):
+    from services.news_stream import AsyncByteReader, aiter_news_from_stream
+
+    body = json.dumps(data).encode()
+
+    async def chunks():
+        for i in range(0, len(body), chunk_size):
+            yield body[i:i + chunk_size]
+
+    reader = AsyncByteReader(chunks())
+    records = [record async for record in aiter_news_from_stream(reader, on_invalid)]
+    return records, reader.bytes_read == len(body)
+
+
+@pytest.mark.parametrize("chunk_size", [7, 4096])
+def test_stream_parser_matches_the_buffered_parser(chunk_size):
+    pytest.importorskip("ijson")
+    data = response(block("Science", [article("a"), article("b")]), block("Sports", [article("c")]))
+    records, read_all = asyncio.run(stream_records(data, chunk_size, collect_invalid()[1]))
+    assert records == list(iter_news_from_api_response(data))
+    assert read_all
+
+
+def test_stream_parser_skips_a_malformed_article():
+    pytest.importorskip("ijson")
+    invalid, on_invalid = collect_invalid()
+    records, _ = asyncio.run(stream_records(MALFORMED, 64, on_invalid))
+    assert [r.heading for r in records] == ["a", "c", "d"]
+    assert invalid == [("Science", 1)]
+
+
+def test_stream_parser_holds_items_until_the_block_datetime_arrives():
+    pytest.importorskip("ijson")
+    # news before name and datetime in the block
+    data = response({"news": [article("a")], "name": "Science", "datetime": 1727881200})
+    records, _ = asyncio.run(stream_records(data, 16, collect_invalid()[1]))
+    assert [(r.heading, r.preference_name) for r in records] == [("a", "Science")]
+
+
+def test_stream_parser_holds_items_until_the_block_name_arrives():
+    pytest.importorskip("ijson")
+    data = response({"datetime": 1727881200, "news": [article("a")], "name": "Science"})
+    invalid, on_invalid = collect_invalid()
+    records, _ = asyncio.run(stream_records(data, 16, on_invalid))
+    assert records == list(iter_news_from_api_response(data))
+    assert [(r.heading, r.preference_name) for r in records] == [("a", "Science")]
+    assert invalid == []
+
+
+def test_stream_parser_skips_items_of_a_block_without_datetime():
+    pytest.importorskip("ijson")
+    data = response({"name": "Science", "news": [article("a"), article("b")]}, block("Sports", [article("c")]))
+    invalid, on_invalid = collect_invalid()
+    records, _ = asyncio.run(stream_records(data, 16, on_invalid))
+    assert [r.heading for r in records] == ["c"]
+    assert invalid == [("Science", 1), ("Science", 1)]
@@ -0,0 +1,123 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from services.news_service import (
+    BulkInsertReport, _upsert_op, _write_chunk, bulk_upsert_news, insert_news_from_api_response,
+    iter_news_from_api_response,
+)
+from services.timing import Timer
+
+
+def payload(*headings: str) -> dict:
+    news = [{"heading": h, "news": f"{h} body", "src": [f"https://example.com/{h}"]} for h in headings]
+    return {"response": [{"agent_response": {"news_fetched": [
+        {"name": "Science", "datetime": 1727881200, "news": news},
+    ]}}]}
+
+
+def records(*headings: str) -> list:
+    return list(iter_news_from_api_response(payload(*headings)))
+
+
+class FailingCollection:
+    """Stands in for the news collection; bulk_write raises `error`."""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+    async def bulk_write(self, ops, ordered=True):
+        raise self.error
+
+
+def write_chunk(collection, chunk: list):
+    ops = [_upsert_op(news, datetime.utcnow()) for news in chunk]
+    return asyncio.run(_write_chunk(collection, 0, chunk, ops, Timer()))
+
+
+def test_duplicate_key_errors_count_as_duplicates_and_other_errors_as_failed():
+    error = BulkWriteError({
+        "upserted": [{"index": 0, "_id": "x"}],
+        "writeErrors": [
+            {"index": 1, "code": 11000, "errmsg": "E11000 duplicate key error"},
+            {"index": 2, "code": 121, "errmsg": "Document failed validation"},
+        ],
+    })
+    result = write_chunk(FailingCollection(error), records("a", "b", "c", "d"))
+    # d was matched by an existing document: neither upserted nor an error
+    assert (result.inserted, result.duplicates, result.failed) == (1, 2, 1)
+    assert result.errors == ["Document failed validation"]
+
+
+def test_a_failing_chunk_counts_all_its_articles_as_failed():
+    result = write_chunk(FailingCollection(ConnectionError("connection reset")), records("a", "b"))
+    assert (result.inserted, result.duplicates, result.failed) == (0, 0, 2)
+    assert result.errors == ["connection reset"]
+
+
+def with_news_collection(test):
+    """Run `test(collection)` against an in-memory MongoDB with the News indexes."""
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+
+    async def main():
+        from beanie import init_beanie
+        from models.news import News
+        from services.indexes import ensure_indexes
+
+        db = mongomock_motor.AsyncMongoMockClient()["test"]
+        await init_beanie(database=db, document_models=[News], skip_indexes=True)
+        await ensure_indexes([News], required_only=True)
+        return await test(db["news"])
+
+    return asyncio.run(main())
+
+
+def test_reingesting_a_payload_inserts_nothing():
+    async def test(collection):
+        data = payload("a", "b", "c")
+        first = await insert_news_from_api_response(data, chunk_size=2)
+        second = await insert_news_from_api_response(data, chunk_size=2)
+        return first, second, await collection.count_documents({})
+
+    first, second, stored = with_news_collection(test)
+    assert (first.inserted, first.duplicates, first.failed) == (3, 0, 0)
+    assert (second.inserted, second.duplicates, second.failed) == (0, 3, 0)
+    assert [chunk.size for chunk in second.chunks] == [2, 1]
+    assert stored == 3
+
+
+def test_same_article_twice_in_one_payload_is_stored_once():
+    async def test(collection):
+        report = await insert_news_from_api_response(payload("a", "a", "b"), chunk_size=10)
+        return report, await collection.count_documents({})
+
+    report, stored = with_news_collection(test)
+    assert (report.inserted, report.duplicates, report.total) == (2, 1, 3)
+    assert stored == 2
+
+
+def test_invalid_articles_are_added_to_the_report():
+    async def test(collection):
+        data = payload("a", "b")
+        data["response"][0]["agent_response"]["news_fetched"][0]["news"].append({"heading": "no body"})
+        return await insert_news_from_api_response(data)
+
+    report = with_news_collection(test)
+    assert (report.inserted, report.invalid, report.failed, report.write_failed, report.total) == (2, 1, 1, 0, 3)
+
+
+def test_async_source_is_written_in_chunks_by_several_writers():
+    async def test(collection):
+        async def source():
+            for record in records(*"abcdefg"):
+                await asyncio.sleep(0)
+                yield record
+
+        report = await bulk_upsert_news(source(), chunk_size=3, writers=2, queue_depth=1, report=BulkInsertReport())
+        return report, await collection.count_documents({})
+
+    report, stored = with_news_collection(test)
+    assert [(chunk.index, chunk.size) for chunk in report.chunks] == [(0, 3), (1, 3), (2, 1)]
+    assert (report.inserted, stored) == (7, 7)
@@ -0,0 +1,119 @@
+import asyncio
+import os
+
+import pytest
+
+from services.response_cache import ResponseCache, cache_key
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class CountingCollection:
+    """Wraps a collection, counting the full-collection scans (count_documents and aggregate)."""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.scans = 0
+
+    def __getattr__(self, name):
+        if name in ("count_documents", "aggregate"):
+            self.scans += 1
+        return getattr(self.collection, name)
+
+
+def make_cache(**kwargs) -> ResponseCache:
+    collection = CountingCollection(mongomock_motor.AsyncMongoMockClient()["test"]["agent_response_cache"])
+    return ResponseCache(collection, **{"ttl": 60, **kwargs})
+
+
+def body(size: int) -> bytes:
+    return os.urandom(size)  # incompressible, so the stored size is about `size`
+
+
+def test_cache_key_ignores_nothing_but_the_session():
+    key = cache_key("app", "u1", "q", "model", "Science")
+    assert key == cache_key("app", "u1", "q", "model", "Science")
+    assert key != cache_key("app", "u2", "q", "model", "Science")
+    assert key != cache_key("app", None, "q", "model", "Science")
+
+
+def test_put_then_get_round_trips_and_counts_hits():
+    async def main():
+        cache = make_cache()
+        await cache.put("k", b'{"response": []}', user_id="u1")
+        first, second = await cache.get("k"), await cache.get("k")
+        entry = await cache.collection.find_one({"_id": "k"})
+        return first, second, entry["hits"], entry["user_id"], await cache.get("missing")
+
+    assert asyncio.run(main()) == (b'{"response": []}', b'{"response": []}', 2, "u1", None)
+
+
+def test_expired_entries_are_not_returned():
+    async def main():
+        cache = make_cache(ttl=0.05)
+        await cache.put("k", b"body")
+        fresh = await cache.get("k")
+        await asyncio.sleep(0.1)
+        return fresh, await cache.get("k")
+
+    assert asyncio.run(main()) == (b"body", None)
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    async def main():
+        cache = make_cache(max_entries=2)
+        await cache.put("a", b"a")
+        await cache.put("b", b"b")
+        await asyncio.sleep(0.01)
+        await cache.get("a")  # b is now the least recently used
+        await cache.put("c", b"c")
+        return sorted(await cache.collection.distinct("_id")), cache.entries
+
+    assert asyncio.run(main()) == (["a", "c"], 2)
+
+
+def test_entries_are_evicted_until_the_size_limit_holds():
+    async def main():
+        cache = make_cache(max_bytes=3000)
+        for key in "abc":
+            await cache.put(key, body(1000))
+            await asyncio.sleep(0.01)
+        kept_before = sorted(await cache.collection.distinct("_id"))
+        await cache.put("d", body(2100))
+        return kept_before, sorted(await cache.collection.distinct("_id")), cache.bytes <= 3000
+
+    # Each gzipped body is a little over 1000 bytes: only two fit
+    assert asyncio.run(main()) == (["b", "c"], ["d"], True)
+
+
+def test_too_large_entry_is_not_cached():
+    async def main():
+        cache = make_cache(max_entry_bytes=100)
+        return await cache.put("k", body(1000)), await cache.collection.count_documents({})
+
+    assert asyncio.run(main()) == (False, 0)
+
+
+def test_stores_under_the_limits_do_not_scan_the_collection():
+    async def main():
+        cache = make_cache(max_entries=100, max_bytes=10_000_000)
+        for i in range(10):
+            await cache.put(str(i), b"body")
+        await cache.put("0", body(500))  # replaced: one entry, its new size
+        return cache.collection.scans, cache.entries, cache.bytes
+
+    scans, entries, size = asyncio.run(main())
+    assert scans == 2  # the first count only: count_documents and aggregate
+    assert entries == 10
+    assert 500 < size < 1000
+
+
+def test_size_is_recounted_after_resync():
+    async def main():
+        cache = make_cache(max_entries=100, resync=0)
+        await cache.put("a", b"a")
+        await cache.collection.delete_many({})  # e.g. expired and removed by MongoDB
+        await cache.put("b", b"b")
+        return cache.entries
+
+    assert asyncio.run(main()) == 1
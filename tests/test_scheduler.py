@@ -0,0 +1,81 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from services.scheduler import CronSchedule, IntervalSchedule, build_schedule
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+def test_parses_lists_ranges_and_steps():
+    schedule = CronSchedule("*/15 9-17 1,15 * *")
+    assert schedule.minutes == {0, 15, 30, 45}
+    assert schedule.hours == set(range(9, 18))
+    assert schedule.days == {1, 15}
+    assert schedule.months == set(range(1, 13))
+
+
+def test_step_from_a_start_value_runs_to_the_end_of_the_field():
+    assert CronSchedule("5/20 * * * *").minutes == {5, 25, 45}
+
+
+def test_sunday_is_both_0_and_7():
+    assert CronSchedule("0 0 * * 7").weekdays == {0}
+    assert CronSchedule("0 0 * * 5-7").weekdays == {5, 6, 0}
+
+
+@pytest.mark.parametrize("expression", [
+    "* * * *",  # too few fields
+    "60 * * * *",  # out of range
+    "* 24 * * *",
+    "* * 0 * *",
+    "*/0 * * * *",  # zero step
+    "5-1 * * * *",  # reversed range
+    "a * * * *",
+])
+def test_rejects_invalid_expressions(expression):
+    with pytest.raises(ValueError):
+        CronSchedule(expression)
+
+
+def test_next_after_is_strictly_later_and_on_the_minute():
+    schedule = CronSchedule("30 * * * *")
+    assert schedule.next_after(utc(2025, 1, 1, 10, 29, 59, 999)) == utc(2025, 1, 1, 10, 30)
+    assert schedule.next_after(utc(2025, 1, 1, 10, 30)) == utc(2025, 1, 1, 11, 30)
+
+
+def test_next_after_rolls_over_the_year():
+    assert CronSchedule("0 6 1 1 *").next_after(utc(2025, 6, 1)) == utc(2026, 1, 1, 6, 0)
+
+
+def test_day_of_month_and_weekday_are_ored_when_both_restricted():
+    # The 13th, or any Friday
+    schedule = CronSchedule("0 0 13 * 5")
+    assert schedule.next_after(utc(2025, 6, 1)) == utc(2025, 6, 6)  # a Friday
+    assert schedule.next_after(utc(2025, 6, 10)) == utc(2025, 6, 13)
+
+
+def test_weekday_alone_restricts_the_day():
+    # Mondays only; 2025-06-01 is a Sunday
+    assert CronSchedule("0 9 * * 1").next_after(utc(2025, 6, 1)) == utc(2025, 6, 2, 9, 0)
+
+
+def test_expression_that_never_fires_raises():
+    with pytest.raises(ValueError, match="never fires"):
+        CronSchedule("0 0 31 2 *").next_after(utc(2025, 1, 1))
+
+
+def test_interval_fires_immediately_then_every_interval():
+    schedule = IntervalSchedule(90)
+    now = utc(2025, 1, 1)
+    assert schedule.next_after(now) == now
+    assert schedule.next_after(now) == utc(2025, 1, 1, 0, 1, 30)
+
+
+def test_build_schedule_prefers_cron():
+    assert isinstance(build_schedule(interval=60, cron="* * * * *"), CronSchedule)
+    assert isinstance(build_schedule(interval=60), IntervalSchedule)
+    with pytest.raises(ValueError):
+        build_schedule()
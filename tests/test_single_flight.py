@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SharedCallError, SingleFlight, coalesce_key
+
+
+def test_coalesce_key_ignores_case_and_whitespace():
+    assert coalesce_key(" Science ", "m", "latest  news") == coalesce_key("science", "m", "Latest news")
+    assert coalesce_key("science", "m", "q") != coalesce_key("science", "other-model", "q")
+
+
+def test_followers_share_the_leaders_result():
+    async def main():
+        flight = SingleFlight()
+        assert flight.join("k") is None
+        leading = flight.lead("k")
+        followers = [asyncio.ensure_future(flight.join("k")) for _ in range(3)]
+        flight.resolve("k", leading, "body")
+        return await asyncio.gather(*followers), flight.join("k")
+
+    results, after = asyncio.run(main())
+    assert results == ["body"] * 3
+    assert after is None  # forgotten once resolved, without linger
+
+
+def test_result_lingers_for_late_callers():
+    async def main():
+        flight = SingleFlight(linger=0.05)
+        leading = flight.lead("k")
+        flight.resolve("k", leading, "body")
+        late = flight.join("k")
+        await asyncio.sleep(0.1)
+        return await late, flight.join("k")
+
+    assert asyncio.run(main()) == ("body", None)
+
+
+def test_failure_reaches_followers_and_is_not_lingered():
+    async def main():
+        flight = SingleFlight(linger=10)
+        leading = flight.lead("k")
+        follower = flight.join("k")
+        flight.fail("k", leading, SharedCallError("boom"))
+        with pytest.raises(SharedCallError):
+            await follower
+        return flight.join("k")
+
+    assert asyncio.run(main()) is None
+
+
+def test_failure_without_followers_is_not_reported_as_unretrieved(caplog):
+    async def main():
+        flight = SingleFlight()
+        flight.fail("k", flight.lead("k"), SharedCallError("boom"))
+
+    asyncio.run(main())
+    assert "never retrieved" not in caplog.text
+
+
+def test_resolve_after_fail_is_ignored():
+    async def main():
+        flight = SingleFlight()
+        leading = flight.lead("k")
+        flight.fail("k", leading, SharedCallError("boom"))
+        flight.resolve("k", leading, "late")
+        return leading.exception()
+
+    assert isinstance(asyncio.run(main()), SharedCallError)
+
+
+def test_flight_from_a_finished_loop_is_dropped():
+    flight = SingleFlight(linger=60)
+
+    async def lead():
+        flight.resolve("k", flight.lead("k"), "body")
+
+    async def join():
+        return flight.join("k")
+
+    asyncio.run(lead())
+    assert asyncio.run(join()) is None
@@ -0,0 +1,61 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from services.spool import Spool
+
+
+async def chunks(*parts: bytes, fail: bool = False):
+    for part in parts:
+        yield part
+    if fail:
+        raise ConnectionError("stream cut")
+
+
+def test_written_body_is_listed_read_and_discarded(tmp_path):
+    spool = Spool(str(tmp_path))
+    spool.write("20250101000000", "user/1", b"body")
+    [entry] = spool.entries()
+    assert (entry.session_id, entry.user_id, spool.read(entry)) == ("20250101000000", "user/1", b"body")
+    spool.discard("20250101000000", "user/1")
+    assert spool.entries() == []
+
+
+def test_tee_commits_only_a_complete_body(tmp_path):
+    async def main():
+        spool = Spool(str(tmp_path))
+        passed = [chunk async for chunk in spool.tee("s1", "u", chunks(b"a", b"b"))]
+        with pytest.raises(ConnectionError):
+            async for _ in spool.tee("s2", "u", chunks(b"a", fail=True)):
+                pass
+        return passed, spool
+
+    passed, spool = asyncio.run(main())
+    assert passed == [b"a", b"b"]
+    assert [(e.session_id, spool.read(e)) for e in spool.entries()] == [("s1", b"ab")]
+    assert list(tmp_path.glob("*.tmp")) == []
+
+
+def test_partial_bodies_are_not_listed_and_stale_ones_are_removed(tmp_path):
+    spool = Spool(str(tmp_path))
+    stale = tmp_path / "s1__u.json.gz.tmp"
+    stale.write_bytes(b"partial")
+    an_hour_ago = time.time() - 3600
+    os.utime(stale, (an_hour_ago, an_hour_ago))
+    in_flight = spool.writer("s2", "u")
+    in_flight.write(b"partial")
+
+    assert spool.entries() == []
+    assert spool.remove_stale(older_than=600) == 1
+    assert not stale.exists()
+    in_flight.commit()  # a body still being written is left alone
+    assert [e.session_id for e in spool.entries()] == ["s2"]
+
+
+def test_invalid_session_ids_are_rejected(tmp_path):
+    spool = Spool(str(tmp_path))
+    for session_id in ("", "a__b", "../x", ".hidden"):
+        with pytest.raises(ValueError):
+            spool.path(session_id, "u")